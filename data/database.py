@@ -28,6 +28,7 @@ def init_db():
         face_id     INTEGER PRIMARY KEY AUTOINCREMENT,
         guest_id    VARCHAR(20) NOT NULL,
         encoding    TEXT NOT NULL,
+        encoding_blob BLOB,
         added_on    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (guest_id) REFERENCES guests(guest_id)
     )
@@ -42,6 +43,7 @@ def init_db():
         device_id   VARCHAR(50),
         timestamp   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         synced      BOOLEAN DEFAULT 0,
+        confidence  REAL,
         FOREIGN KEY (guest_id) REFERENCES guests(guest_id)
     )
     """)
@@ -0,0 +1,88 @@
+"""
+Attendance writer: rows are group-committed, flushed on time and on close,
+and a busy DB is retried instead of losing rows.
+"""
+import sys
+import os
+import sqlite3
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from attendance_writer import AttendanceWriter
+
+
+def attendance_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE attendance (attendance_id INTEGER PRIMARY KEY AUTOINCREMENT, guest_id TEXT, "
+                 "device_id TEXT, method TEXT, timestamp TEXT, confidence REAL)")
+    conn.commit()
+    return conn
+
+
+def rows(conn):
+    return conn.execute("SELECT guest_id, device_id, confidence FROM attendance ORDER BY attendance_id").fetchall()
+
+
+def wait_written(writer, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while writer.written < count and time.time() < deadline:
+        time.sleep(0.01)
+    return writer.written
+
+
+def test_full_batch_is_written_in_one_transaction(tmp_path):
+    db_path = str(tmp_path / "attendance.db")
+    conn = attendance_db(db_path)
+    writer = AttendanceWriter(db_path, batch_size=5, flush_ms=60000).start()
+    for i in range(4):
+        writer.add(f"G{i}", "LIFT", "camera", f"2024-01-01T09:00:{i:02d}", 0.9)
+    time.sleep(0.1)
+    assert rows(conn) == []   # waits for a full batch or flush_ms
+    writer.add("G4", "LIFT", "camera", "2024-01-01T09:00:04", 0.9)
+    assert wait_written(writer, 5) == 5
+    assert writer.batches == 1
+    assert [r[0] for r in rows(conn)] == [f"G{i}" for i in range(5)]
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    writer.close()
+
+
+def test_partial_batch_is_flushed_after_the_interval(tmp_path):
+    db_path = str(tmp_path / "attendance.db")
+    conn = attendance_db(db_path)
+    writer = AttendanceWriter(db_path, batch_size=50, flush_ms=50).start()
+    writer.add("G1", "GATE", "camera", "2024-01-01T09:00:00")
+    assert wait_written(writer, 1) == 1
+    assert writer.batches == 1
+    assert rows(conn) == [("G1", "GATE", None)]
+    writer.close()
+
+
+def test_close_flushes_and_later_rows_are_still_written(tmp_path):
+    db_path = str(tmp_path / "attendance.db")
+    conn = attendance_db(db_path)
+    writer = AttendanceWriter(db_path, batch_size=50, flush_ms=60000).start()
+    writer.add("G1", "LIFT", "camera", "2024-01-01T09:00:00")
+    writer.add("G2", "LIFT", "camera", "2024-01-01T09:00:01")
+    writer.close()
+    assert [r[0] for r in rows(conn)] == ["G1", "G2"]
+    assert writer.batches == 1
+
+    writer.add("G3", "LIFT", "camera", "2024-01-01T09:00:02")   # a job finishing during shutdown
+    assert [r[0] for r in rows(conn)] == ["G1", "G2", "G3"]
+    writer.close()   # a second close is a no-op
+
+
+def test_busy_db_is_retried(tmp_path):
+    db_path = str(tmp_path / "attendance.db")
+    conn = attendance_db(db_path)
+    writer = AttendanceWriter(db_path, batch_size=1, busy_timeout_ms=20, retries=10).start()
+    blocker = sqlite3.connect(db_path, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")   # e.g. the webapp holding the write lock
+    writer.add("G1", "LIFT", "camera", "2024-01-01T09:00:00")
+    threading.Timer(0.2, blocker.rollback).start()
+    assert wait_written(writer, 1, timeout=5.0) == 1
+    writer.close()
+    assert writer.busy_retries > 0 and writer.lost == 0
+    assert rows(conn) == [("G1", "LIFT", None)]
@@ -0,0 +1,91 @@
+"""
+Capture manifest: append, tombstone on remove, compaction.
+"""
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from capture_manifest import CaptureManifest
+from frame_index import manifest_record, parse_capture_name
+
+
+def add(manifest, event_id, person=1, frame_no=1):
+    return manifest.append(event_id, f"{event_id}_{person}", frame_no, 1700000000.0 + frame_no,
+                           f"{event_id}_{person}_{frame_no:02d}_1.jpg", 1, bbox=(1, 2, 3, 4),
+                           track_id=person, sharpness=12.345)
+
+
+def lines(manifest):
+    with open(manifest.path, encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+def test_append_and_read(tmp_path):
+    manifest = CaptureManifest(str(tmp_path))
+    entry = add(manifest, "E1")
+    add(manifest, "E1", frame_no=2)
+    add(manifest, "E2")
+    events = manifest.read()
+    assert list(events) == ["E1", "E2"]
+    assert [e["frame_no"] for e in events["E1"]] == [1, 2]
+    assert events["E1"][0] == entry
+    assert entry["bbox"] == [1, 2, 3, 4] and entry["sharpness"] == 12.35
+
+
+def test_remove_writes_tombstone(tmp_path):
+    manifest = CaptureManifest(str(tmp_path))
+    add(manifest, "E1")
+    add(manifest, "E2")
+    manifest.remove("E1")
+    assert list(manifest.read()) == ["E2"]
+    assert len(lines(manifest)) == 3
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    manifest = CaptureManifest(str(tmp_path))
+    add(manifest, "E1")
+    manifest.close()
+    with open(manifest.path, "a", encoding="utf-8") as fh:
+        fh.write('{"event_id": "E2", "pho')
+    assert list(manifest.read()) == ["E1"]
+
+
+def test_compact_keeps_live_records(tmp_path):
+    manifest = CaptureManifest(str(tmp_path))
+    for event_id in ("E1", "E2", "E3"):
+        add(manifest, event_id)
+    manifest.remove("E2")
+    manifest.compact(lambda entry: entry["event_id"] != "E3")
+    assert list(manifest.read()) == ["E1"]
+    assert len(lines(manifest)) == 1
+    add(manifest, "E4")   # appends reopen the rewritten file
+    assert list(manifest.read()) == ["E1", "E4"]
+
+
+def test_remove_compacts_without_losing_appends(tmp_path):
+    manifest = CaptureManifest(str(tmp_path), compact_after=3)
+
+    def append_many():
+        for i in range(200):
+            add(manifest, f"A{i}")
+
+    writer = threading.Thread(target=append_many)
+    writer.start()
+    for i in range(60):
+        add(manifest, f"R{i}")
+        manifest.remove(f"R{i}")
+    writer.join()
+    assert list(manifest.read()) == [f"A{i}" for i in range(200)]
+
+
+def test_manifest_record_matches_the_file_name(tmp_path):
+    manifest = CaptureManifest(str(tmp_path))
+    entry = add(manifest, "E4", person=2, frame_no=7)
+    from_manifest = manifest_record(str(tmp_path), entry)
+    from_name = parse_capture_name(str(tmp_path), entry["file"], entry["capture_ts"])
+    for key in ("path", "person_num", "frame_no", "datetime"):
+        assert from_manifest[key] == from_name[key]
+    assert (from_manifest["person_num"], from_manifest["frame_no"]) == (2, 7)
+    assert from_manifest["box"] == (1, 2, 3, 4) and from_manifest["track_id"] == 2
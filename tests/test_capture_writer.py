@@ -0,0 +1,67 @@
+"""
+Capture writer: a full queue coalesces captures of the same person, and
+when_written() fires once a person's captures are all on disk.
+"""
+import sys
+import os
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from capture_writer import CaptureWriter
+
+
+class GatedWriter(CaptureWriter):
+    """Holds every write until `gate` is set."""
+
+    def __init__(self, **kwargs):
+        self.gate = threading.Event()
+        self.busy = threading.Event()
+        super().__init__(**kwargs)
+
+    def write(self, image, path):
+        self.busy.set()
+        self.gate.wait()
+        super().write(image, path)
+
+
+def image(value):
+    return np.full((16, 16, 3), value, dtype=np.uint8)
+
+
+def test_full_queue_coalesces_same_key_and_drops_others(tmp_path):
+    writer = GatedWriter(workers=1, queue_size=2)
+    path = lambda name: str(tmp_path / name)
+    writer.submit("E1_1", image(10), path("E1_1_01_1.jpg"))
+    assert writer.busy.wait(2.0)   # the only worker is now blocked on this one
+    assert writer.submit("E1_2", image(20), path("E1_2_01_1.jpg"))
+    assert writer.submit("E1_3", image(30), path("E1_3_01_1.jpg"))
+    assert writer.submit("E1_2", image(40), path("E1_2_02_1.jpg"))        # replaces E1_2_01
+    assert not writer.submit("E1_4", image(50), path("E1_4_01_1.jpg"))    # nothing to replace
+
+    done = []
+    writer.when_written("E1_2", lambda: done.append(sorted(os.listdir(tmp_path))))
+    assert done == []
+    writer.gate.set()
+    assert writer.flush(timeout=2.0)
+    writer.close()
+
+    assert done and "E1_2_02_1.jpg" in done[0]
+    assert sorted(os.listdir(tmp_path)) == ["E1_1_01_1.jpg", "E1_2_02_1.jpg", "E1_3_01_1.jpg"]
+    assert (writer.submitted, writer.written, writer.coalesced, writer.dropped) == (5, 3, 1, 1)
+
+
+def test_inline_npy_writes_are_atomic(tmp_path):
+    writer = CaptureWriter(workers=0, fmt="npy")
+    path = str(tmp_path / "E2_1_01_1.npy")
+    written = []
+    writer.submit("E2_1", image(7), path, on_written=written.append)
+    assert written == [path]
+    assert os.listdir(tmp_path) == ["E2_1_01_1.npy"]   # no .part left behind
+    np.testing.assert_array_equal(np.load(path), image(7))
+
+    ran = []
+    writer.when_written("E2_1", lambda: ran.append(True))   # nothing in flight: runs now
+    assert ran == [True]
@@ -0,0 +1,34 @@
+"""
+Attendance cooldown shared by two camera processes (two DB connections).
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from cooldown_store import CooldownStore
+
+T0 = datetime(2024, 1, 1, 9, 0, 0)
+
+
+def test_cooldown_shared_across_connections(tmp_path):
+    db_path = str(tmp_path / "attendance.db")
+    lift, gate = CooldownStore(db_path, 30), CooldownStore(db_path, 30)
+
+    assert lift.claim("G1", "LIFT", T0)
+    assert not gate.claim("G1", "GATE", T0 + timedelta(seconds=10))   # seen by LIFT
+    assert not lift.claim("G1", "LIFT", T0 + timedelta(seconds=20))   # answered from the cache
+    assert lift.cache_hits == 1
+    assert gate.claim("G1", "GATE", T0 + timedelta(seconds=31))
+    assert not lift.claim("G1", "LIFT", T0 + timedelta(seconds=40))   # cache is stale, DB is not
+    assert gate.claim("G2", "GATE", T0 + timedelta(seconds=40))
+
+
+def test_out_of_order_sighting_does_not_move_last_back(tmp_path):
+    db_path = str(tmp_path / "attendance.db")
+    lift, gate = CooldownStore(db_path, 30), CooldownStore(db_path, 30)
+
+    assert lift.claim("G1", "LIFT", T0 + timedelta(seconds=60))
+    assert gate.claim("G1", "GATE", T0)   # older sighting, outside the cooldown
+    assert not gate.claim("G1", "GATE", T0 + timedelta(seconds=70))
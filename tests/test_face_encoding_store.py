@@ -0,0 +1,93 @@
+"""
+Binary guest_faces encodings: migrating a DB that only has JSON text, and the
+trigger-fed change log recognizers read their deltas from.
+"""
+import sys
+import os
+import json
+import sqlite3
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from face_encoding_store import (ensure_encoding_blob_column, ensure_face_change_log, insert_encoding,
+                                 last_face_change, load_encodings, read_face_changes)
+
+rng = np.random.default_rng(2)
+
+
+def old_db(path):
+    """A DB created before encoding_blob existed, with JSON text encodings."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE guests (guest_id VARCHAR(20) PRIMARY KEY, name VARCHAR(100) NOT NULL,
+                         status VARCHAR(20) DEFAULT 'active');
+    CREATE TABLE guest_faces (face_id INTEGER PRIMARY KEY AUTOINCREMENT, guest_id VARCHAR(20) NOT NULL,
+                              encoding TEXT NOT NULL);
+    INSERT INTO guests (guest_id, name) VALUES ('G1', 'Asha'), ('G2', 'Ben');
+    """)
+    return conn
+
+
+def add_json(conn, guest_id, encoding):
+    conn.execute("INSERT INTO guest_faces (guest_id, encoding) VALUES (?, ?)", (guest_id, json.dumps(encoding.tolist())))
+    conn.commit()
+
+
+def test_json_encodings_migrate_to_blobs(tmp_path):
+    conn = old_db(str(tmp_path / "guests.db"))
+    encodings = rng.normal(scale=0.1, size=(3, 128))
+    for guest_id, enc in zip(("G1", "G1", "G2"), encodings):
+        add_json(conn, guest_id, enc)
+    conn.execute("INSERT INTO guest_faces (guest_id, encoding) VALUES ('G2', 'not an encoding')")
+    conn.commit()
+
+    assert ensure_encoding_blob_column(conn) == 3
+    assert ensure_encoding_blob_column(conn) == 0   # nothing left to convert
+    blob = conn.execute("SELECT encoding_blob FROM guest_faces WHERE face_id = 1").fetchone()[0]
+    assert len(blob) == 512
+
+    face_ids, guest_ids, matrix = load_encodings(conn)
+    assert face_ids == [1, 2, 3] and guest_ids == ["G1", "G1", "G2"]
+    assert matrix.dtype == np.float32 and matrix.shape == (3, 128)
+    np.testing.assert_allclose(matrix, encodings, atol=1e-6)
+
+
+def test_new_and_old_writers_both_load(tmp_path):
+    conn = old_db(str(tmp_path / "guests.db"))
+    ensure_encoding_blob_column(conn)
+    new, old = rng.normal(scale=0.1, size=(2, 128))
+    insert_encoding(conn.cursor(), "G1", new)
+    add_json(conn, "G2", old)   # a writer that does not know encoding_blob yet
+
+    text = conn.execute("SELECT encoding FROM guest_faces WHERE guest_id = 'G1'").fetchone()[0]
+    np.testing.assert_allclose(json.loads(text), new, atol=1e-6)
+    face_ids, guest_ids, matrix = load_encodings(conn, "g.guest_id = ?", ("G2",))
+    assert guest_ids == ["G2"]
+    np.testing.assert_allclose(matrix[0], old, atol=1e-6)
+
+
+def test_triggers_log_face_and_guest_changes(tmp_path):
+    conn = old_db(str(tmp_path / "guests.db"))
+    ensure_encoding_blob_column(conn)
+    ensure_face_change_log(conn)
+    ensure_face_change_log(conn)   # safe to run on every start
+    assert last_face_change(conn) == 0
+
+    cur = conn.cursor()
+    for guest_id in ("G1", "G1", "G2"):
+        insert_encoding(cur, guest_id, rng.normal(scale=0.1, size=128))
+    conn.commit()
+    last, face_ids, guest_ids = read_face_changes(conn, 0)
+    assert (face_ids, guest_ids) == ({1, 2, 3}, set())
+
+    conn.execute("DELETE FROM guest_faces WHERE face_id = 2")
+    conn.execute("UPDATE guests SET status = 'inactive' WHERE guest_id = 'G2'")
+    conn.execute("UPDATE guests SET status = 'inactive' WHERE guest_id = 'G2'")   # unchanged: not logged
+    conn.execute("UPDATE guests SET name = 'Asha K' WHERE guest_id = 'G1'")       # not a status change
+    conn.commit()
+    newer, face_ids, guest_ids = read_face_changes(conn, last)
+    assert (face_ids, guest_ids) == ({2}, {"G2"})
+    assert newer == last_face_change(conn) == last + 2
+    assert read_face_changes(conn, newer) == (newer, set(), set())
@@ -0,0 +1,111 @@
+"""
+Threaded frame grabber: in-order reads, dropped frames, pairing and shutdown.
+"""
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from frame_grabber import FrameGrabber
+
+
+class FakeSource:
+    """Hands out numbered frames; `gate` holds each read until the test releases it."""
+
+    def __init__(self, frames, lossless=False):
+        self.frames = frames
+        self.lossless = lossless
+        self.finished = False
+        self.sent = 0
+        self.released = 0
+        self.gate = threading.Semaphore(0)
+
+    def open(self):
+        pass
+
+    def read(self):
+        self.gate.acquire()
+        if self.sent >= self.frames:
+            self.finished = True
+            return False, None
+        self.sent += 1
+        return True, np.full((2, 2, 3), self.sent, dtype=np.uint8)
+
+    def release(self):
+        self.released += 1
+
+
+def feed(grabber, count):
+    """Let the source deliver `count` more frames and wait until they are buffered."""
+    target = grabber.frame_id + count
+    grabber.source.gate.release(count)
+    deadline = time.time() + 2.0
+    while grabber.frame_id < target and time.time() < deadline:
+        time.sleep(0.005)
+    assert grabber.frame_id == target
+
+
+def close(grabber):
+    grabber.stopped = True
+    grabber.source.gate.release(100)   # let a blocked read return so stop() joins at once
+    grabber.stop()
+
+
+def test_frames_read_in_order_and_overflow_counted_as_dropped():
+    grabber = FrameGrabber(FakeSource(10), buffer_size=3).start()
+    feed(grabber, 2)
+    assert [grabber.read()[0] for _ in range(2)] == [1, 2]
+
+    feed(grabber, 5)   # frames 3-7, only 5-7 still buffered
+    ids = [grabber.read()[0] for _ in range(3)]
+    assert ids == [5, 6, 7]
+    assert grabber.stats()["dropped"] == 2
+    assert grabber.read(timeout=0.05) == (None, None, None)
+    close(grabber)
+
+
+def test_buffer_size_one_returns_latest_frame():
+    grabber = FrameGrabber(FakeSource(10), buffer_size=1).start()
+    feed(grabber, 4)
+    frame_id, _, frame = grabber.read()
+    assert frame_id == 4 and frame[0, 0, 0] == 4
+    assert grabber.stats()["dropped"] == 3
+    close(grabber)
+
+
+def test_lossless_source_waits_for_reader_and_finishes():
+    source = FakeSource(5, lossless=True)
+    source.gate.release(100)
+    grabber = FrameGrabber(source, buffer_size=2).start()
+    ids = []
+    while True:
+        frame_id, _, _ = grabber.read()
+        if frame_id is None:
+            break
+        ids.append(frame_id)
+    assert ids == [1, 2, 3, 4, 5]
+    assert grabber.finished and grabber.stats()["dropped"] == 0
+    grabber.stop()
+    assert source.released == 1
+
+
+def test_nearest_pairs_by_capture_time():
+    grabber = FrameGrabber(FakeSource(10), buffer_size=4).start()
+    feed(grabber, 3)
+    _, ts, _ = grabber.buffer[1]
+    assert grabber.nearest(ts)[0] == 2
+    assert grabber.nearest(ts + 60, max_skew=1.0) == (None, None, None)
+    close(grabber)
+
+
+def test_stop_releases_a_stuck_source():
+    source = FakeSource(10)
+    grabber = FrameGrabber(source).start()
+    grabber.thread.join(timeout=0.05)   # capture thread is now blocked in read()
+    grabber.stop()
+    assert source.released == 1
+    source.gate.release()               # unblock it; it releases again on exit
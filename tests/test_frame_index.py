@@ -0,0 +1,63 @@
+"""
+Frame index: captures are found by event without listing the folder.
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from frame_index import FrameIndex, parse_capture_name
+
+
+def touch(folder, name):
+    path = folder / name
+    path.write_bytes(b"jpg")
+    return str(path)
+
+
+def test_parse_capture_name():
+    record = parse_capture_name("/ot", "E7_2_05_3_10-20-110-220.jpg", 1700000000.0)
+    assert (record["person_num"], record["frame_no"], record["box"]) == (2, 5, (10, 20, 110, 220))
+    assert record["path"] == os.path.join("/ot", "E7_2_05_3_10-20-110-220.jpg")
+    assert parse_capture_name("/ot", "E7_2_05_3.npy", 0)["box"] is None
+    assert parse_capture_name("/ot", "E7_x_05_3.jpg", 0) is None
+    assert parse_capture_name("/ot", "E7_2_05_3.txt", 0) is None
+
+
+def test_seed_then_add_and_discard(tmp_path):
+    for name in ("E1_1_02_1.jpg", "E1_1_01_1.jpg", "E2_1_01_2.jpg", "readme.txt"):
+        touch(tmp_path, name)
+    index = FrameIndex()
+    folder = str(tmp_path)
+    assert not index.tracked(folder)
+    assert index.files(folder, "E1") is None   # callers fall back to listing the folder
+
+    assert index.seed(folder) == ["E1", "E2"]
+    assert sorted(r["frame_no"] for r in index.files(folder, "E1")) == [1, 2]
+
+    path = touch(tmp_path, "E3_1_01_1_5-5-50-90.jpg")
+    index.add(path, time.time(), track_id=4, sharpness=120.5)
+    (record,) = index.files(folder, "E3")
+    assert (record["box"], record["track_id"], record["sharpness"]) == ((5, 5, 50, 90), 4, 120.5)
+    assert index.pending(folder) == ["E1", "E2", "E3"]
+
+    index.discard(folder, "E1")
+    index.drop_paths(folder, [os.path.join(folder, "E2_1_01_2.jpg")])
+    assert index.pending(folder) == ["E3"]
+    assert index.files(folder, "E1") == []
+
+
+def test_reseed_reads_the_manifest(tmp_path):
+    folder = str(tmp_path)
+    first = FrameIndex()
+    first.seed(folder)
+    path = touch(tmp_path, "E5_2_03_1.jpg")
+    first.add(path, 1700000000.5, track_id=9)
+    touch(tmp_path, "E6_1_01_1.jpg")   # saved without a manifest entry
+    os.remove(touch(tmp_path, "E7_1_01_1.jpg"))
+
+    restarted = FrameIndex()
+    assert restarted.seed(folder) == ["E5", "E6"]
+    (record,) = restarted.files(folder, "E5")
+    assert record["track_id"] == 9 and record["datetime"].timestamp() == 1700000000.5
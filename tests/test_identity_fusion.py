@@ -0,0 +1,62 @@
+"""
+Identity fusion: voting across a person's faces and the confidence score.
+"""
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from identity_fusion import fuse_identity
+from known_face_index import KnownFaceIndex, PrototypeFaceIndex
+
+TOLERANCE = 0.5
+rng = np.random.default_rng(1)
+CENTERS = rng.normal(scale=0.1, size=(20, 128)).astype(np.float32)
+ENCODINGS = np.repeat(CENTERS, 3, axis=0) + rng.normal(scale=0.01, size=(60, 128)).astype(np.float32)
+GUEST_IDS = [f"G{g}" for g in range(20) for _ in range(3)]
+
+
+def faces_of(guest, count, noise=0.01):
+    return CENTERS[guest] + rng.normal(scale=noise, size=(count, 128)).astype(np.float32)
+
+
+def stranger(count):
+    return rng.normal(scale=0.1, size=(count, 128)).astype(np.float32)
+
+
+def test_majority_wins_and_unmatched_faces_lower_confidence():
+    index = KnownFaceIndex(ENCODINGS, GUEST_IDS)
+    voters = faces_of(3, 3)
+    guest, confidence, distance, votes, faces = fuse_identity(
+        index, np.vstack([voters, faces_of(7, 1), stranger(1)]), TOLERANCE)
+    assert (guest, votes, faces) == ("G3", 3, 5)
+    # Mean distance over the three faces that voted for G3 only
+    nearest = np.linalg.norm(voters[:, None, :] - ENCODINGS[None, 9:12, :], axis=2).min(axis=1)
+    assert np.isclose(distance, nearest.mean(), atol=1e-4)
+    assert np.isclose(confidence, 3 / 5 * (1 - distance / TOLERANCE))
+
+    _, clean_confidence, _, _, _ = fuse_identity(index, faces_of(3, 3), TOLERANCE)
+    assert clean_confidence > confidence
+
+
+def test_no_faces_or_no_match_is_unknown():
+    index = KnownFaceIndex(ENCODINGS, GUEST_IDS)
+    assert fuse_identity(index, [], TOLERANCE) == ("unknown", 0.0, None, 0, 0)
+    assert fuse_identity(index, stranger(3), TOLERANCE) == ("unknown", 0.0, None, 0, 3)
+    assert fuse_identity(KnownFaceIndex(), faces_of(0, 2), TOLERANCE)[0] == "unknown"
+
+
+def test_tie_goes_to_lower_mean_distance():
+    index = KnownFaceIndex(ENCODINGS, GUEST_IDS)
+    near, far = faces_of(2, 1, noise=0.001), faces_of(9, 1, noise=0.02)
+    assert fuse_identity(index, np.vstack([far, near]), TOLERANCE)[0] == "G2"
+
+
+def test_prototype_index_gives_the_exact_result():
+    faces = np.vstack([faces_of(5, 4), stranger(1)])
+    exact = fuse_identity(KnownFaceIndex(ENCODINGS, GUEST_IDS), faces, TOLERANCE)
+    approx = fuse_identity(PrototypeFaceIndex(ENCODINGS, GUEST_IDS, shortlist=1), faces, TOLERANCE)
+    assert approx[0] == exact[0] and approx[3:] == exact[3:]
+    assert np.isclose(approx[1], exact[1], atol=1e-4)
@@ -0,0 +1,113 @@
+"""
+Known-face indexes (exact, prototype, IVF) against a brute-force scan.
+"""
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from ann_index import IVFFaceIndex, train_centroids
+from known_face_index import KnownFaceIndex, PrototypeFaceIndex
+
+TOLERANCE = 0.5
+
+
+def gallery(guests=40, per_guest=5, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=0.1, size=(guests, 128)).astype(np.float32)
+    encodings = np.repeat(centers, per_guest, axis=0) + \
+        rng.normal(scale=0.01, size=(guests * per_guest, 128)).astype(np.float32)
+    guest_ids = [f"G{g}" for g in range(guests) for _ in range(per_guest)]
+    queries = np.vstack([centers[:10] + rng.normal(scale=0.01, size=(10, 128)),
+                         rng.normal(scale=0.1, size=(5, 128))]).astype(np.float32)
+    return encodings, guest_ids, np.arange(len(encodings)), queries
+
+
+def brute_force(encodings, guest_ids, queries):
+    dist = np.linalg.norm(queries[:, None, :] - encodings[None, :, :], axis=2)
+    best = dist.argmin(axis=1)
+    return [(guest_ids[b] if dist[i, b] <= TOLERANCE else "unknown", float(dist[i, b]))
+            for i, b in enumerate(best)]
+
+
+def assert_same(results, expected):
+    assert [gid for gid, _ in results] == [gid for gid, _ in expected]
+    # The prototype index gives no distance when every guest is pruned
+    matched = [i for i, (gid, _) in enumerate(expected) if gid != "unknown"]
+    np.testing.assert_allclose([results[i][1] for i in matched], [expected[i][1] for i in matched], atol=1e-4)
+
+
+def test_exact_index_matches_brute_force():
+    encodings, guest_ids, face_ids, queries = gallery()
+    index = KnownFaceIndex(encodings, guest_ids, face_ids)
+    assert_same(index.match(queries, TOLERANCE), brute_force(encodings, guest_ids, queries))
+
+    ids, dists = index.query(queries, k=3)
+    full = np.sort(np.linalg.norm(queries[:, None, :] - encodings[None, :, :], axis=2), axis=1)[:, :3]
+    np.testing.assert_allclose(dists, full, atol=1e-4)
+
+
+
+def test_with_changes_returns_a_new_index():
+    encodings, guest_ids, face_ids, queries = gallery()
+    index = KnownFaceIndex(encodings, guest_ids, face_ids)
+    smaller = index.with_changes(remove_guest_ids=["G0"], remove_face_ids=[6])
+    assert len(index) == 200 and len(smaller) == 194
+    assert smaller.match(queries[:1], TOLERANCE)[0][0] != "G0"
+
+    added = smaller.with_changes(add=([500], ["G0"], queries[:1]))
+    gid, dist = added.match(queries[:1], TOLERANCE)[0]
+    assert gid == "G0" and dist < 1e-3
+    assert added.face_ids[-1] == 500
+
+
+def test_prototype_index_match_is_exact():
+    encodings, guest_ids, face_ids, queries = gallery()
+    index = PrototypeFaceIndex(encodings, guest_ids, face_ids, shortlist=2)
+    assert_same(index.match(queries, TOLERANCE), brute_force(encodings, guest_ids, queries))
+
+
+def test_prototype_with_changes_removes_a_guest():
+    encodings, guest_ids, face_ids, queries = gallery()
+    index = PrototypeFaceIndex(encodings, guest_ids, face_ids)
+    smaller = index.with_changes(remove_guest_ids=["G0"])
+    assert type(smaller) is PrototypeFaceIndex and len(smaller) == len(index) - 5
+    assert smaller.match(queries[:1], TOLERANCE)[0][0] != "G0"
+    assert_same(smaller.match(queries[1:], TOLERANCE), brute_force(encodings[5:], guest_ids[5:], queries[1:]))
+
+
+def test_ivf_index_with_all_cells_probed_is_exact():
+    encodings, guest_ids, face_ids, queries = gallery()
+    centroids = train_centroids(encodings, 8)
+    index = IVFFaceIndex(encodings, guest_ids, face_ids, centroids, nprobe=8)
+    assert_same(index.match(queries, TOLERANCE), brute_force(encodings, guest_ids, queries))
+
+
+def test_ivf_index_recall_with_few_cells():
+    encodings, guest_ids, face_ids, queries = gallery()
+    index = IVFFaceIndex(encodings, guest_ids, face_ids, train_centroids(encodings, 8), nprobe=2)
+    expected = brute_force(encodings, guest_ids, queries)
+    hits = sum(gid == want for (gid, _), (want, _) in zip(index.match(queries, TOLERANCE), expected))
+    assert hits >= len(queries) - 1
+
+
+def test_ivf_with_changes_keeps_the_cells():
+    encodings, guest_ids, face_ids, queries = gallery()
+    index = IVFFaceIndex(encodings, guest_ids, face_ids, train_centroids(encodings, 8), nprobe=8)
+    smaller = index.with_changes(remove_guest_ids=["G0"])
+    assert type(smaller) is IVFFaceIndex and len(smaller) == len(index) - 5
+    assert smaller.centroids is index.centroids and smaller.trained_count == index.trained_count
+    assert smaller.match(queries[:1], TOLERANCE)[0][0] != "G0"
+
+
+def test_guest_distances_is_exact_for_every_index():
+    encodings, guest_ids, face_ids, queries = gallery()
+    rows = np.array(guest_ids) == "G0"
+    expected = np.linalg.norm(queries[:, None, :] - encodings[None, rows, :], axis=2).min(axis=1)
+    for index in (KnownFaceIndex(encodings, guest_ids, face_ids),
+                  PrototypeFaceIndex(encodings, guest_ids, face_ids),
+                  IVFFaceIndex(encodings, guest_ids, face_ids, train_centroids(encodings, 8), nprobe=1)):
+        np.testing.assert_allclose(index.guest_distances(queries, "G0"), expected, atol=1e-4)
+        assert np.isinf(index.with_changes(remove_guest_ids=["G0"]).guest_distances(queries[:1], "G0")[0])
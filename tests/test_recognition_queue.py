@@ -0,0 +1,112 @@
+"""
+Persistent recognition queue: jobs survive a restart, failures are retried,
+and a disk hand-off folder left behind is queued again.
+"""
+import sys
+import os
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+# test_guest_fields may have imported the webapp's own `utilities` package
+for name in [m for m in sys.modules if m.split('.')[0] == 'utilities']:
+    del sys.modules[name]
+
+import recognition_queue
+from recognition_queue import RecognitionQueue
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def capture(frame_num):
+    return {"image": np.full((8, 8, 3), 40 * frame_num, dtype=np.uint8), "frame_num": frame_num,
+            "person_count": 1, "capture_ts": 1700000000.0 + frame_num, "face_box": (1, 2, 6, 7)}
+
+
+def test_jobs_left_by_a_stopped_queue_are_resumed(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "jobs.db")
+    first = RecognitionQueue(workers=0, owner="LIFT", db_path=db_path).start()
+    first.submit("E1_1", captures=[capture(1), capture(2)], device_id="LIFT")
+    first.submit("E2_1", device_id="LIFT", folder=str(tmp_path))
+    first.submit("E2_1", device_id="LIFT", folder=str(tmp_path))   # already queued
+    first.stop()
+    assert first.counts()["queued"] == 2
+
+    seen = {}
+    monkeypatch.setattr(recognition_queue, "run_face_recognition",
+                        lambda photo_id, folder, device_id: seen.setdefault(photo_id, folder))
+    monkeypatch.setattr(recognition_queue, "run_face_recognition_frames",
+                        lambda photo_id, captures, device_id: seen.setdefault(photo_id, captures))
+    other = RecognitionQueue(workers=1, owner="GATE", db_path=db_path).start()
+    resumed = RecognitionQueue(workers=1, owner="LIFT", db_path=db_path).start()
+    assert wait_for(lambda: resumed.counts()["done"] == 2)
+    resumed.stop()
+    other.stop()
+
+    assert seen["E2_1"] == str(tmp_path)
+    frames = seen["E1_1"]
+    assert [c["frame_num"] for c in frames] == [1, 2]
+    assert frames[1]["face_box"] == (1, 2, 6, 7)
+    assert abs(int(frames[1]["image"][0, 0, 0]) - 80) <= 2   # JPEG round-trip
+    assert other.counts()["done"] == 0
+
+
+def test_failed_job_is_retried_then_given_up(tmp_path, monkeypatch):
+    calls = {}
+
+    def flaky(photo_id, folder, device_id):
+        calls[photo_id] = calls.get(photo_id, 0) + 1
+        if photo_id == "E9_1" or calls[photo_id] == 1:
+            raise IOError("camera share offline")
+
+    monkeypatch.setattr(recognition_queue, "run_face_recognition", flaky)
+    queue = RecognitionQueue(workers=1, max_attempts=3, db_path=str(tmp_path / "jobs.db")).start()
+    queue.submit("E1_1", folder=str(tmp_path))
+    queue.submit("E9_1", folder=str(tmp_path))
+    assert wait_for(lambda: queue.completed + queue.failed == 2)
+    queue.stop()
+
+    assert calls == {"E1_1": 2, "E9_1": 3}
+    assert (queue.completed, queue.failed, queue.retried) == (1, 1, 3)
+    assert queue.counts() == {"queued": 0, "running": 0, "done": 1, "failed": 1}
+    assert queue.active_events(str(tmp_path)) == set()
+
+
+def test_recover_folder_queues_unprocessed_events(tmp_path, monkeypatch):
+    folder = tmp_path / "OT"
+    folder.mkdir()
+    for name in ("E1_1_01_1.jpg", "E1_1_02_1.jpg", "E2_1_01_2.jpg", "E3_1_01_1.jpg", "notes.txt"):
+        (folder / name).write_bytes(b"jpg")
+    (folder / "E3").mkdir()   # already recognised: its face crops folder exists
+
+    recovered = []
+    monkeypatch.setattr(recognition_queue, "run_face_recognition",
+                        lambda photo_id, folder, device_id: recovered.append(photo_id))
+    queue = RecognitionQueue(workers=1, db_path=str(tmp_path / "jobs.db")).start()
+    assert queue.recover_folder(str(folder), device_id="LIFT") == 2
+    assert wait_for(lambda: queue.completed == 2)
+    queue.stop()
+    assert sorted(recovered) == ["E1", "E2"]
+
+
+def test_reserved_event_stays_active_until_its_job_is_done(tmp_path, monkeypatch):
+    release = []
+    monkeypatch.setattr(recognition_queue, "run_face_recognition",
+                        lambda photo_id, folder, device_id: wait_for(lambda: release))
+    queue = RecognitionQueue(workers=1, db_path=str(tmp_path / "jobs.db")).start()
+    folder = str(tmp_path)
+    queue.reserve("E1_1", folder)   # end_event: captures still being written
+    assert queue.active_events(folder) == {"E1"}
+    queue.submit("E1_1", folder=folder, reserved=True)
+    assert wait_for(lambda: queue.running == 1)
+    assert queue.active_events(folder) == {"E1"}
+    release.append(True)
+    assert wait_for(lambda: queue.completed == 1)
+    assert queue.active_events(folder) == set()
+    queue.stop()
@@ -0,0 +1,61 @@
+"""
+Retention: age and size budgets of a capture folder, and the files it must keep.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from retention import RetentionManager
+
+NOW = 1700000000.0
+
+
+def capture(folder, name, age_seconds, size=1000):
+    path = os.path.join(folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(b"\0" * size)
+    os.utime(path, (NOW - age_seconds, NOW - age_seconds))
+    return path
+
+
+def remaining(folder):
+    return sorted(os.path.relpath(os.path.join(root, name), folder)
+                  for root, _, names in os.walk(folder) for name in names)
+
+
+def test_age_budget(tmp_path):
+    folder = str(tmp_path)
+    capture(folder, "E1_1_01_1.jpg", 4000)
+    capture(folder, "E2_1_01_1.jpg", 100)
+    capture(folder, "captures.jsonl", 9000)   # the manifest is never swept
+    capture(folder, "captures.jsonl.tmp", 9000)
+    capture(folder, "E3_1_01_1.jpg.part", 9000)   # still being written by the capture writer
+    manager = RetentionManager(folder, max_bytes=float("inf"), max_age_seconds=3600, batch_pause=0)
+    assert manager.sweep(now=NOW) == 1000
+    assert remaining(folder) == ["E2_1_01_1.jpg", "E3_1_01_1.jpg.part", "captures.jsonl", "captures.jsonl.tmp"]
+
+
+def test_size_budget_deletes_oldest_first(tmp_path):
+    folder = str(tmp_path)
+    for i, age in enumerate((500, 400, 300, 200, 100)):
+        capture(folder, f"E{i}_1_01_1.jpg", age)
+    capture(folder, "E9/E9_1_01_1_face_1.jpg", 600)
+    manager = RetentionManager(folder, max_bytes=2500, max_age_seconds=float("inf"), batch_size=2, batch_pause=0)
+    manager.sweep(now=NOW)
+    assert remaining(folder) == ["E3_1_01_1.jpg", "E4_1_01_1.jpg"]
+    assert not os.path.exists(os.path.join(folder, "E9"))   # emptied sub-folder removed
+    assert manager.bytes_in_use == 2000 and manager.files_deleted == 4
+
+
+def test_protected_events_are_kept(tmp_path):
+    folder = str(tmp_path)
+    capture(folder, "E1_1_01_1.jpg", 5000)
+    capture(folder, "E1/E1_1_01_1_face_1.jpg", 5000)
+    capture(folder, "E2_1_01_1.jpg", 5000)
+    manager = RetentionManager(folder, max_bytes=0, max_age_seconds=3600, batch_pause=0,
+                               protected=lambda f: {"E1"})
+    manager.sweep(now=NOW)
+    assert remaining(folder) == [os.path.join("E1", "E1_1_01_1_face_1.jpg"), "E1_1_01_1.jpg"]
+    assert manager.files_kept == 2
@@ -0,0 +1,46 @@
+"""
+SORT tracker: a person keeps their track id across a short occlusion.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from tracker import Tracker
+
+
+def walk(start_x, frames, step=10, y=100, w=60, h=160):
+    return [(start_x + i * step, y, start_x + i * step + w, y + h) for i in range(frames)]
+
+
+def test_id_kept_across_occlusion():
+    tracker = Tracker(iou_threshold=0.3, max_age=5)
+    path = walk(0, 12)
+    ids = set()
+    for i, box in enumerate(path):
+        if 4 <= i < 7:
+            assert tracker.update([]) == []   # hidden for three detections
+            continue
+        (track_id, _), = tracker.update([box])
+        ids.add(track_id)
+    assert ids == {1}
+
+
+def test_track_dropped_after_max_age():
+    tracker = Tracker(iou_threshold=0.3, max_age=2)
+    box = (0, 0, 60, 160)
+    tracker.update([box])
+    for _ in range(3):
+        tracker.update([])
+    (track_id, _), = tracker.update([box])
+    assert track_id == 2
+
+
+def test_two_people_keep_their_ids():
+    tracker = Tracker(iou_threshold=0.3, max_age=5)
+    left, right = walk(0, 8), walk(400, 8, step=-10)
+    first = dict((box[0], tid) for tid, box in tracker.update([left[0], right[0]]))
+    for a, b in zip(left[1:], right[1:]):
+        tracks = dict(tracker.update([b, a]))
+        assert tracks[first[0]][0] == a[0]
+        assert tracks[first[400]][0] == b[0]
@@ -0,0 +1,88 @@
+"""
+YOLO worker: detections come back keyed by their frame, and cameras share one batch.
+"""
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'yolo_cam'))
+
+from yolo_worker import YOLOWorker
+
+
+class FakeBackend:
+    """Returns one box per frame built from the frame's pixel value; `gate` holds each call."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.calls = []
+
+    def detect(self, frames):
+        self.gate.wait()
+        self.calls.append(len(frames))
+        return [[(int(f[0, 0, 0]),) * 4 + (0.9,)] for f in frames]
+
+
+def frame(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def wait_result(worker, source=None, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        envelope = worker.get_results(source)
+        if envelope is not None:
+            return envelope
+        time.sleep(0.005)
+    return None
+
+
+def test_result_carries_the_frame_it_was_computed_on():
+    worker = YOLOWorker(backend=FakeBackend()).start()
+    for frame_id in (1, 2, 3):
+        worker.infer_async(frame_id, 100.0 + frame_id, frame(frame_id * 10))
+        envelope = wait_result(worker)
+        assert envelope["frame_id"] == frame_id
+        assert envelope["capture_ts"] == 100.0 + frame_id
+        assert envelope["boxes"][0][0] == frame_id * 10
+        assert envelope["frame"][0, 0, 0] == frame_id * 10
+    assert worker.get_results() is None
+    worker.stop()
+
+
+def test_pending_frame_is_replaced_by_a_newer_one():
+    backend = FakeBackend()
+    worker = YOLOWorker(backend=backend).start()
+    backend.gate.clear()
+    worker.infer_async(1, 1.0, frame(1))        # picked up, inference blocked
+    time.sleep(0.05)
+    worker.infer_async(2, 2.0, frame(2))        # waits in the slot ...
+    worker.infer_async(3, 3.0, frame(3))        # ... and is replaced
+    backend.gate.set()
+
+    ids = [wait_result(worker)["frame_id"], wait_result(worker)["frame_id"]]
+    assert ids == [1, 3]
+    assert worker.dropped_in == 1
+    worker.stop()
+
+
+def test_pending_frames_of_all_cameras_share_one_batch():
+    backend = FakeBackend()
+    worker = YOLOWorker(backend=backend, max_batch=2).start()
+    backend.gate.clear()
+    worker.infer_async(1, 1.0, frame(1), source="warmup")
+    time.sleep(0.05)                            # worker is now blocked on the warm-up call
+    for source, value in (("LIFT", 11), ("GATE", 22), ("DOOR", 33)):
+        worker.infer_async(7, 7.0, frame(value), source=source)
+    backend.gate.set()
+
+    results = {source: wait_result(worker, source) for source in ("LIFT", "GATE", "DOOR")}
+    assert {s: r["boxes"][0][0] for s, r in results.items()} == {"LIFT": 11, "GATE": 22, "DOOR": 33}
+    assert backend.calls == [1, 2, 1]           # max_batch splits the three cameras
+    assert results["LIFT"]["batch_size"] == results["GATE"]["batch_size"] == 2
+    assert wait_result(worker, "warmup")["frame_id"] == 1
+    worker.stop()
@@ -39,6 +39,7 @@ CREATE TABLE IF NOT EXISTS guest_faces (
     face_id     INTEGER PRIMARY KEY AUTOINCREMENT,
     guest_id    VARCHAR(20) NOT NULL,
     encoding    TEXT NOT NULL,   -- JSON string of 128-dim face encoding
+    encoding_blob BLOB,          -- same encoding as raw float32 bytes (512 bytes)
     added_on    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (guest_id) REFERENCES guests(guest_id)
 )
@@ -54,6 +55,7 @@ CREATE TABLE IF NOT EXISTS attendance (
     device_id   VARCHAR(50),
     timestamp   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     synced      BOOLEAN DEFAULT 0,
+    confidence  REAL,            -- fused face-identity confidence (camera rows)
     FOREIGN KEY (guest_id) REFERENCES guests(guest_id)
 )
 """)
@@ -887,11 +889,12 @@ for person_dir in KNOWN_DIR.iterdir():
 
         encoding = encs[0]
         encoding_json = json.dumps(encoding.tolist())  # save as JSON string
+        encoding_blob = encoding.astype("float32").tobytes()  # what the recognizers read
 
         # Insert into DB
         cursor.execute(
-            "INSERT INTO guest_faces (guest_id, encoding) VALUES (?, ?)",
-            (guest_id, encoding_json)
+            "INSERT INTO guest_faces (guest_id, encoding, encoding_blob) VALUES (?, ?, ?)",
+            (guest_id, encoding_json, encoding_blob)
         )
 
 
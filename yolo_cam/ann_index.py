@@ -0,0 +1,155 @@
+"""
+Approximate nearest-neighbour (IVF) index over enrolled face encodings.
+
+The gallery is split into `nlist` k-means cells; a query only scans the
+rows of its `nprobe` nearest cells. Centroids and each face_id's cell are
+saved next to WhiteHouse.db, so a restart does not retrain, and faces added
+later are simply assigned to their nearest existing cell.
+
+Exact search (KnownFaceIndex) stays the default and the fallback: see
+build_face_index().
+"""
+import os
+
+import numpy as np
+
+from known_face_index import KnownFaceIndex, PrototypeFaceIndex
+
+
+def _sq_dists(a, b, b_sq=None):
+    """(len(a), len(b)) squared Euclidean distances."""
+    if b_sq is None:
+        b_sq = np.einsum("ij,ij->i", b, b)
+    return np.maximum(np.einsum("ij,ij->i", a, a)[:, None] + b_sq[None, :] - 2.0 * (a @ b.T), 0.0)
+
+
+def nearest_centroid(vectors, centroids, chunk=8192):
+    out = np.empty(len(vectors), dtype=np.int32)
+    c_sq = np.einsum("ij,ij->i", centroids, centroids)
+    for start in range(0, len(vectors), chunk):
+        out[start:start + chunk] = np.argmin(_sq_dists(vectors[start:start + chunk], centroids, c_sq), axis=1)
+    return out
+
+
+def train_centroids(matrix, nlist, iterations=10, sample=64, seed=0):
+    """Lloyd's k-means on a sample of at most nlist*sample rows."""
+    rng = np.random.default_rng(seed)
+    data = matrix
+    if len(data) > nlist * sample:
+        data = data[rng.choice(len(data), nlist * sample, replace=False)]
+    centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroid(data, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty cells from random rows
+        if not filled.all():
+            centroids[~filled] = data[rng.choice(len(data), int((~filled).sum()), replace=False)]
+    return centroids.astype(np.float32)
+
+
+# ------------------- IVF Face Index -------------------
+class IVFFaceIndex(KnownFaceIndex):
+    """KnownFaceIndex that answers queries from the nprobe nearest k-means cells only."""
+
+    def __init__(self, encodings, guest_ids, face_ids, centroids, cells=None, nprobe=8, trained_count=None):
+        super().__init__(encodings, guest_ids, face_ids)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.trained_count = len(self) if trained_count is None else trained_count
+        self.nprobe = min(nprobe, len(self.centroids))
+        if cells is None:
+            cells = nearest_centroid(self.matrix, self.centroids) if len(self) else np.zeros(0, np.int32)
+        self.cells = np.asarray(cells, dtype=np.int32)
+        # CSR layout: rows sorted by cell, offsets[c]:offsets[c+1] are cell c's rows
+        self.order = np.argsort(self.cells, kind="stable")
+        self.offsets = np.searchsorted(self.cells[self.order], np.arange(len(self.centroids) + 1))
+
+    def with_changes(self, remove_face_ids=(), remove_guest_ids=(), add=None):
+        keep = ~np.isin(self.face_ids, np.asarray(list(remove_face_ids), dtype=np.int64))
+        if len(remove_guest_ids):
+            keep &= ~np.isin(self.guest_ids, np.asarray(list(remove_guest_ids), dtype=object))
+        face_ids, guest_ids = self.face_ids[keep], self.guest_ids[keep]
+        matrix, cells = self.matrix[keep], self.cells[keep]
+        if add is not None and len(add[0]):
+            new = np.asarray(add[2], dtype=np.float32).reshape(-1, 128)
+            face_ids = np.concatenate([face_ids, np.asarray(add[0], dtype=np.int64)])
+            guest_ids = np.concatenate([guest_ids, np.asarray(add[1], dtype=object)])
+            matrix = np.vstack([matrix, new])
+            cells = np.concatenate([cells, nearest_centroid(new, self.centroids)])
+        return IVFFaceIndex(matrix, guest_ids, face_ids, self.centroids, cells, self.nprobe, self.trained_count)
+
+    def query(self, queries, k=1):
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        k = min(k, len(self))
+        ids = np.full((len(q), k), "unknown", dtype=object)
+        dists = np.full((len(q), k), np.inf, dtype=np.float32)
+        if k == 0 or len(q) == 0:
+            return ids, dists
+
+        probes = np.argsort(_sq_dists(q, self.centroids), axis=1)[:, :self.nprobe]
+        for i, cells in enumerate(probes):
+            rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+            if len(rows) == 0:
+                continue
+            d = np.sqrt(_sq_dists(q[i:i + 1], self.matrix[rows], self.sq_norms[rows])[0])
+            top = np.argsort(d)[:k]
+            ids[i, :len(top)] = self.guest_ids[rows[top]]
+            dists[i, :len(top)] = d[top]
+        return ids, dists
+
+    # --------------------------------------------------------
+    def save(self, path):
+        """Persist centroids and each face_id's cell (not the encodings, which live in the DB)."""
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, centroids=self.centroids, face_ids=self.face_ids, cells=self.cells,
+                 trained_count=self.trained_count)
+        os.replace(tmp, path)
+
+
+def load_ivf(path, matrix, guest_ids, face_ids, nprobe=8):
+    """IVFFaceIndex over the given rows using centroids saved at `path`, or None if there are none."""
+    if not os.path.exists(path):
+        return None
+    try:
+        saved = np.load(path)
+        centroids = saved["centroids"]
+        cell_of = dict(zip(saved["face_ids"].tolist(), saved["cells"].tolist()))
+        trained_count = int(saved["trained_count"])
+    except Exception as e:
+        print(f"[WARN] Could not read ANN index {path}: {e}")
+        return None
+
+    face_ids = np.asarray(face_ids, dtype=np.int64)
+    cells = np.array([cell_of.get(f, -1) for f in face_ids.tolist()], dtype=np.int32)
+    missing = cells < 0
+    if missing.any():
+        cells[missing] = nearest_centroid(np.asarray(matrix, dtype=np.float32)[missing], centroids)
+    return IVFFaceIndex(matrix, guest_ids, face_ids, centroids, cells, nprobe, trained_count)
+
+
+def build_face_index(matrix, guest_ids, face_ids, kind="exact", path=None, min_size=20000,
+                     nlist=None, nprobe=8, retrain_growth=2.0):
+    """
+    Index for the recognizer. With kind="ivf" and at least `min_size` rows,
+    an IVF index is loaded from `path` (retrained when missing or when the
+    gallery has grown `retrain_growth` times since training). kind="prototype"
+    gives the per-guest prototype index; otherwise exact search is used.
+    """
+    count = 0 if matrix is None else len(matrix)
+    if kind == "prototype":
+        return PrototypeFaceIndex(matrix, guest_ids, face_ids)
+    if kind != "ivf" or count < min_size:
+        return KnownFaceIndex(matrix, guest_ids, face_ids)
+
+    index = load_ivf(path, matrix, guest_ids, face_ids, nprobe) if path else None
+    if index is None or count > index.trained_count * retrain_growth:
+        nlist = nlist or max(16, int(2 * np.sqrt(count)))
+        print(f"[INFO] Training ANN index: {count} encodings, {nlist} cells")
+        matrix = np.asarray(matrix, dtype=np.float32)
+        index = IVFFaceIndex(matrix, guest_ids, face_ids, train_centroids(matrix, nlist), nprobe=nprobe)
+        if path:
+            index.save(path)
+    return index
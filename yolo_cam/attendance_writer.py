@@ -0,0 +1,153 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+
+# ------------------- Attendance Writer -------------------
+class AttendanceWriter:
+    """
+    Buffered writer for camera attendance rows.
+
+    Rows are queued in memory and written in one transaction when
+    `batch_size` rows are pending or `flush_ms` has passed since the first
+    one, by a background thread with its own connection. The DB is switched
+    to WAL so the webapp's readers are not blocked by camera writes, and a
+    busy DB (another container or the API holding the write lock) is retried
+    with backoff instead of failing the insert. close() flushes what is left;
+    a row added after close() is written at once on its own connection.
+    """
+
+    def __init__(self, db_path, batch_size=50, flush_ms=500, busy_timeout_ms=5000, retries=5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.busy_timeout_ms = busy_timeout_ms
+        self.retries = retries
+        self.cond = threading.Condition()
+        self.pending = []
+        self.first_pending_ts = None
+        self.stopped = False
+        self.written = 0
+        self.batches = 0
+        self.busy_retries = 0
+        self.lost = 0
+        self.conn = None
+        self.thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if str(mode).lower() != "wal":
+            print(f"[WARN] Attendance DB journal mode is {mode}, not WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def start(self):
+        self.conn = self._connect()
+        self.thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def add(self, guest_id, device_id, method, ts, confidence=None):
+        """Queue one attendance row (ts is an ISO timestamp string)."""
+        row = (guest_id, device_id, method, ts, confidence)
+        with self.cond:
+            if not self.stopped:
+                self.pending.append(row)
+                if self.first_pending_ts is None:
+                    # Wake the writer so the flush_ms timer starts with the first row
+                    self.first_pending_ts = time.time()
+                    self.cond.notify()
+                elif len(self.pending) >= self.batch_size:
+                    self.cond.notify()
+                return
+        # Closed (a recognition job finishing during shutdown): nothing would flush it
+        conn = self._connect()
+        try:
+            self._write([row], conn)
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.stopped:
+                    if len(self.pending) >= self.batch_size:
+                        break
+                    if self.first_pending_ts is not None:
+                        remaining = self.first_pending_ts + self.flush_interval - time.time()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+                    else:
+                        self.cond.wait()
+                rows, self.pending, self.first_pending_ts = self.pending, [], None
+                stopped = self.stopped
+            if rows:
+                self._write(rows)
+            if stopped:
+                break
+
+    def _write(self, rows, conn=None):
+        conn = conn or self.conn
+        delay = 0.05
+        for attempt in range(self.retries + 1):
+            try:
+                with conn:   # one transaction for the whole batch
+                    conn.executemany(
+                        "INSERT INTO attendance (guest_id, device_id, method, timestamp, confidence) "
+                        "VALUES (?,?,?,?,?)", rows)
+                self.written += len(rows)
+                self.batches += 1
+                return True
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                if ("locked" not in message and "busy" not in message) or attempt == self.retries:
+                    self.lost += len(rows)
+                    print(f"[ERROR] Could not write {len(rows)} attendance rows: {e}")
+                    return False
+                self.busy_retries += 1
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+        return False
+
+    def close(self, timeout=10.0):
+        """Flush pending rows and stop the writer thread."""
+        with self.cond:
+            if self.stopped:
+                return
+            self.stopped = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.conn is not None:
+            self.conn.close()
+        print(f"[INFO] Attendance writer closed: {self.written} rows in {self.batches} batches, "
+              f"{self.busy_retries} busy retries, {self.lost} lost")
+
+
+_attendance_writer = None
+_attendance_writer_lock = threading.Lock()
+
+
+def get_attendance_writer(db_path=None):
+    """Process-wide writer (started on first use, flushed at interpreter exit)."""
+    global _attendance_writer
+    with _attendance_writer_lock:
+        if _attendance_writer is None:
+            _attendance_writer = AttendanceWriter(
+                db_path,
+                batch_size=int(os.getenv("ATTENDANCE_BATCH_SIZE", 50)),
+                flush_ms=int(os.getenv("ATTENDANCE_FLUSH_MS", 500)),
+                busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+            ).start()
+            atexit.register(_attendance_writer.close)
+        return _attendance_writer
+
+
+def close_attendance_writer():
+    if _attendance_writer is not None:
+        _attendance_writer.close()
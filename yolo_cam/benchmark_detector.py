@@ -0,0 +1,86 @@
+"""
+Compare person-detector backends on a recorded clip.
+
+Usage:
+    python benchmark_detector.py clip.mp4 ultralytics:yolov8n.pt onnxruntime:yolov8n.onnx \
+        onnxruntime:yolov8n.int8.onnx --frames 300 --threads 4
+
+Each backend runs over the same decoded frames (optionally cropped to the
+FRAME_TOP/BOTTOM/LEFT/RIGHT ROI) and reports FPS, p50/p99 latency and the
+average number of persons found.
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from detector_backends import create_backend
+
+
+def load_frames(path, max_frames, roi=None):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            break
+        if roi is not None:
+            top, bottom, left, right = roi
+            frame = np.ascontiguousarray(frame[top:bottom, left:right])
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_backend(spec, frames, conf, threads, warmup):
+    backend_name, model_path = spec.split(":", 1)
+    backend = create_backend(model_path, conf, backend=backend_name, threads=threads)
+
+    for frame in frames[:warmup]:
+        backend.detect([frame])
+
+    latencies = []
+    persons = 0
+    started = time.perf_counter()
+    for frame in frames:
+        t0 = time.perf_counter()
+        boxes = backend.detect([frame])[0]
+        latencies.append(time.perf_counter() - t0)
+        persons += len(boxes)
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "backend": spec,
+        "fps": len(frames) / elapsed if elapsed > 0 else 0.0,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "persons": persons / max(1, len(frames)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark person-detector backends on a clip")
+    parser.add_argument("clip", help="recorded video file (.mp4/.webm)")
+    parser.add_argument("backends", nargs="+", help="backend:model, e.g. onnxruntime:yolov8n.onnx")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=int(os.getenv("DETECTOR_THREADS", 0)))
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("TOP", "BOTTOM", "LEFT", "RIGHT"),
+                        help="crop frames like FRAME_TOP/BOTTOM/LEFT/RIGHT before detection")
+    args = parser.parse_args()
+
+    frames = load_frames(args.clip, args.frames, args.roi)
+    if not frames:
+        raise SystemExit(f"No frames decoded from {args.clip}")
+    print(f"[INFO] Loaded {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]} from {args.clip}")
+
+    rows = [run_backend(spec, frames, args.conf, args.threads, args.warmup) for spec in args.backends]
+
+    print(f"\n{'backend':<45} {'fps':>8} {'p50 ms':>8} {'p99 ms':>8} {'persons':>8}")
+    for row in rows:
+        print(f"{row['backend']:<45} {row['fps']:>8.1f} {row['p50']:>8.1f} "
+              f"{row['p99']:>8.1f} {row['persons']:>8.2f}")
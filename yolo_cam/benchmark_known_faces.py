@@ -0,0 +1,116 @@
+"""
+Micro-benchmark of known-face matching.
+
+Usage:
+    python benchmark_known_faces.py --sizes 100 10000 100000 --queries 4 --repeat 50 --nprobe 4 8 16
+
+Compares the list-based compare_faces + face_distance pattern (two distance
+passes over a re-stacked list) with KnownFaceIndex, PrototypeFaceIndex and
+the IVF index (ann_index.py), and reports p50/p99 latency per batch of query
+faces plus recall@1 against exact search. For the prototype index it also
+prints the average number of distances computed per query.
+
+The synthetic gallery has 3 encodings per guest scattered around a guest
+centre; queries are new noisy samples of enrolled guests.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ann_index import IVFFaceIndex, train_centroids
+from known_face_index import KnownFaceIndex, PrototypeFaceIndex
+
+
+def random_encodings(n, rng):
+    enc = rng.standard_normal((n, 128)).astype(np.float32)
+    return enc / np.linalg.norm(enc, axis=1, keepdims=True) * 0.9
+
+
+def gallery(n, rng, per_guest=3, spread=0.25):
+    centres = random_encodings(max(1, n // per_guest), rng)
+    guest = np.arange(n) % len(centres)
+    noise = rng.standard_normal((n, 128)).astype(np.float32) * spread / np.sqrt(128)
+    return centres[guest] + noise, centres
+
+
+def recall_at_1(exact, approx, queries):
+    exact_ids, _ = exact.query(queries, k=1)
+    approx_ids, _ = approx.query(queries, k=1)
+    return float(np.mean(exact_ids[:, 0] == approx_ids[:, 0]))
+
+
+def list_match(known_list, query, tolerance):
+    # What face_recognition.compare_faces + face_distance do per face
+    matches = list(np.linalg.norm(np.array(known_list) - query, axis=1) <= tolerance)
+    distances = np.linalg.norm(np.array(known_list) - query, axis=1)
+    best = int(np.argmin(distances))
+    return best if matches[best] else None
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    latencies = np.array(latencies) * 1000
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark known-face matching")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=4, help="faces matched per batch")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--recall-queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'enrolled':>9} {'method':<22} {'p50 ms':>9} {'p99 ms':>9} {'recall@1':>9}")
+    for n in args.sizes:
+        known, centres = gallery(n, rng)
+        known_list = list(known)
+        ids = [f"G{i % len(centres)}" for i in range(n)]
+
+        def sample_queries(m):
+            picks = rng.integers(0, len(centres), m)
+            return centres[picks] + rng.standard_normal((m, 128)).astype(np.float32) * 0.25 / np.sqrt(128)
+
+        queries = sample_queries(args.queries)
+
+        t0 = time.perf_counter()
+        index = KnownFaceIndex(known, ids)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        rows = [
+            ("list, per face", timed(lambda: [list_match(known_list, q, args.tolerance) for q in queries],
+                                     args.repeat)),
+            ("index, batched", timed(lambda: index.match(queries, args.tolerance), args.repeat)),
+            ("index, top-5", timed(lambda: index.query(queries, k=5), args.repeat)),
+        ]
+        for name, (p50, p99) in rows:
+            print(f"{n:>9} {name:<22} {p50:>9.2f} {p99:>9.2f}")
+        print(f"{n:>9} {'index build':<22} {build_ms:>9.2f}")
+
+        recall_queries = sample_queries(args.recall_queries)
+        proto = PrototypeFaceIndex(known, ids, np.arange(n))
+        p50, p99 = timed(lambda: proto.match(queries, args.tolerance), args.repeat)
+        proto.distance_count = 0
+        exact_names = [name for name, _ in index.match(recall_queries, args.tolerance)]
+        proto_names = [name for name, _ in proto.match(recall_queries, args.tolerance)]
+        agree = float(np.mean([a == b for a, b in zip(exact_names, proto_names)]))
+        print(f"{n:>9} {'prototype match':<22} {p50:>9.2f} {p99:>9.2f} {agree:>9.3f}  "
+              f"{proto.distance_count / len(recall_queries):.0f} distances/query (exact: {n})")
+
+        nlist = max(16, int(2 * np.sqrt(n)))
+        t0 = time.perf_counter()
+        centroids = train_centroids(known, nlist)
+        print(f"{n:>9} {f'ivf train ({nlist} cells)':<22} {(time.perf_counter() - t0) * 1000:>9.2f}")
+        for nprobe in args.nprobe:
+            ivf = IVFFaceIndex(known, ids, np.arange(n), centroids, nprobe=nprobe)
+            p50, p99 = timed(lambda: ivf.match(queries, args.tolerance), args.repeat)
+            recall = recall_at_1(index, ivf, recall_queries)
+            print(f"{n:>9} {f'ivf, nprobe={nprobe}':<22} {p50:>9.2f} {p99:>9.2f} {recall:>9.3f}")
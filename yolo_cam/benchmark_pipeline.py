@@ -0,0 +1,222 @@
+"""
+Replay benchmark of the full camera pipeline.
+
+Usage:
+    python benchmark_pipeline.py clip.mp4 --rate fast
+    python benchmark_pipeline.py frames_dir/ --rate 10 --full-frame --json bench.json
+
+Feeds a recorded clip (or a folder of images) through the same FrameGrabber,
+YOLOWorker, tracker, capture and recognition queue as Yolo_Runner, paced at
+the file's native FPS, as fast as the pipeline takes frames, or at a fixed
+rate. Reports per-stage throughput and p50/p95/p99 latency:
+
+    read        frame age when the pipeline picks it up
+    detect      capture -> detection collected (YOLO queue wait + inference)
+    infer       YOLO inference per batch
+    process     tracking, event logic and capture for one detection
+    recognize   one recognition job (face encoding, matching, attendance)
+
+plus CPU% (100 = one core, including the face-encoder processes) and peak
+RSS. Attendance goes to a temporary copy of the DB and captures to a
+temporary OT folder unless --db / --ot are given.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from frame_sources import IMAGE_EXTENSIONS
+from utilities.environment_variables import load_environment
+
+
+def percentiles(values):
+    if not values:
+        return None, None, None
+    ms = np.array(values) * 1000
+    return tuple(float(np.percentile(ms, p)) for p in (50, 95, 99))
+
+
+def first_frame_size(path):
+    """(width, height) of the first frame of a clip or image folder."""
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        frame = cv2.imread(os.path.join(path, names[0])) if names else None
+    else:
+        cap = cv2.VideoCapture(path)
+        _, frame = cap.read()
+        cap.release()
+    if frame is None:
+        raise SystemExit(f"No frames decoded from {path}")
+    return frame.shape[1], frame.shape[0]
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the camera pipeline on a recorded clip")
+    parser.add_argument("source", help="video file (.mp4/.webm) or folder of images")
+    parser.add_argument("--rate", default="fast", help="native | fast | frames per second")
+    parser.add_argument("--fps", type=float, default=25.0, help="native rate of an image folder")
+    parser.add_argument("--frames", type=int, default=0, help="stop after this many frames (0 = all)")
+    parser.add_argument("--model", default=None, help="YOLO model (default YOLO_MODEL)")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--handoff", default=None, help="memory | disk (default CAPTURE_HANDOFF)")
+    parser.add_argument("--full-frame", action="store_true",
+                        help="use the whole frame as ROI instead of FRAME_TOP/BOTTOM/LEFT/RIGHT")
+    parser.add_argument("--env", default="./../data/.env.yolocam")
+    parser.add_argument("--db", default=None, help="attendance DB (default: temporary copy)")
+    parser.add_argument("--ot", default=None, help="capture folder (default: temporary)")
+    parser.add_argument("--drain-timeout", type=float, default=120.0,
+                        help="seconds to wait for queued recognition jobs after the clip ends")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    load_environment(args.env)
+    workdir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    os.environ.update({
+        "CAMERA_ID": "BENCH",
+        "RECOG_QUEUE_OWNER": "BENCH",
+        "REPLAY_RATE": args.rate,
+        "REPLAY_LOOP": "false",
+        "REPLAY_FPS": str(args.fps),
+        "OT": args.ot or workdir,
+    })
+
+    # Imported after the environment is set: these modules read it at import time
+    import face_recognition_worker
+    from camera_pipeline import CameraConfig, CameraPipeline
+    from capture_writer import close_capture_writer
+    from attendance_writer import close_attendance_writer
+    from face_encoder import get_face_encoder
+    from recognition_queue import get_recognition_queue
+    from yolo_worker import YOLOWorker
+
+    # The worker opens its DB lazily: point it at the copy before anything is recognized,
+    # so the live DB is only read by the copy below
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(workdir, "bench.db")
+        shutil.copy(face_recognition_worker.DB_PATH, db_path)
+    face_recognition_worker.set_db_path(db_path)
+    recognizer = get_recognition_queue(db_path)
+
+    values = {"RTSP_URL": args.source, "DUAL_STREAM": "false", "SHOW_WINDOW": "false"}
+    if args.handoff:
+        values["CAPTURE_HANDOFF"] = args.handoff
+    if args.full_frame:
+        width, height = first_frame_size(args.source)
+        values.update({"FRAME_TOP": 0, "FRAME_BOTTOM": height, "FRAME_LEFT": 0, "FRAME_RIGHT": width,
+                       "CAP_PROP_FRAME_WIDTH": width, "CAP_PROP_FRAME_HEIGHT": height})
+    config = CameraConfig(values)
+
+    detector = YOLOWorker(args.model or os.getenv("YOLO_MODEL", "yolov8n.pt"),
+                          conf=args.conf, max_batch=1).start()
+    pipeline = CameraPipeline(config, detector)
+
+    # ---- Stage timing around the pipeline's own methods ----
+    timings = {"read": [], "detect": [], "infer": [], "process": []}
+    submit, process = pipeline.submit, pipeline.process
+
+    def timed_submit(timeout=1.0):
+        read = submit(timeout)
+        if read:
+            timings["read"].append(time.time() - pipeline.capture_ts)
+        return read
+
+    def timed_process(result):
+        timings["detect"].append(time.time() - result["capture_ts"])
+        timings["infer"].append(result["infer_time"])
+        t0 = time.perf_counter()
+        process(result)
+        timings["process"].append(time.perf_counter() - t0)
+
+    pipeline.submit, pipeline.process = timed_submit, timed_process
+
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    pipeline.start()
+    idle = 0
+    last_active = time.perf_counter()
+    while not pipeline.stop_requested:
+        if pipeline.step(timeout=0.5):
+            idle = 0
+            last_active = time.perf_counter()
+        elif pipeline.grabber.finished:
+            time.sleep(0.5)
+            idle += 1
+            if idle >= 4:   # clip done and no detection came back for ~2s
+                break
+        if args.frames and pipeline.grabber.last_read_id >= args.frames:
+            break
+    if pipeline.event_active:
+        pipeline.end_event()
+    # Throughput up to the last frame or detection handled, not the idle wait after it
+    pipeline_seconds = last_active - wall_start
+
+    # ---- Let recognition finish what the clip produced ----
+    close_capture_writer()
+    deadline = time.time() + args.drain_timeout
+    while recognizer.depth() > 0 and time.time() < deadline:
+        time.sleep(0.2)
+    wall_seconds = time.perf_counter() - wall_start
+
+    pipeline.stop()
+    detector.stop()
+    recognizer.stop()
+    get_face_encoder().shutdown(wait=True)   # reaped, so their CPU shows in RUSAGE_CHILDREN
+    close_attendance_writer()
+    cpu_used = cpu_seconds() - cpu_start
+
+    timings["recognize"] = list(recognizer.job_seconds)
+    grabber = pipeline.grabber.stats()
+    stages = {}
+    for stage, samples in timings.items():
+        p50, p95, p99 = percentiles(samples)
+        span = wall_seconds if stage == "recognize" else pipeline_seconds
+        stages[stage] = {"count": len(samples), "per_second": len(samples) / span if span else 0.0,
+                         "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+    own_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    report = {
+        "source": args.source,
+        "rate": args.rate,
+        "frames_read": grabber["captured"] - grabber["dropped"],
+        "frames_skipped": grabber["dropped"],
+        "detector_dropped": detector.dropped_in + detector.dropped_out,
+        "recognition_jobs": recognizer.completed,
+        "recognition_failed": recognizer.failed,
+        "recognition_pending": recognizer.depth(),
+        "pipeline_seconds": pipeline_seconds,
+        "wall_seconds": wall_seconds,
+        "cpu_percent": 100.0 * cpu_used / wall_seconds if wall_seconds else 0.0,
+        "peak_rss_mb": own_rss,
+        "peak_child_rss_mb": child_rss,
+        "stages": stages,
+    }
+
+    print(f"\n{'stage':<10} {'count':>7} {'per s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, row in stages.items():
+        if not row["count"]:
+            print(f"{stage:<10} {0:>7}")
+            continue
+        print(f"{stage:<10} {row['count']:>7} {row['per_second']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    print(f"\nframes read {report['frames_read']} skipped {report['frames_skipped']} | "
+          f"detector dropped {report['detector_dropped']} | recognition done {report['recognition_jobs']} "
+          f"failed {report['recognition_failed']} pending {report['recognition_pending']}")
+    print(f"pipeline {pipeline_seconds:.1f}s, total {wall_seconds:.1f}s | CPU {report['cpu_percent']:.0f}% "
+          f"| peak RSS {own_rss:.0f} MB (largest encoder process {child_rss:.0f} MB)")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
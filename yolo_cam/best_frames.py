@@ -0,0 +1,94 @@
+import heapq
+
+import cv2
+
+# Box-height bands used for the on-screen distance levels (Very Close / Medium / Far)
+SIZE_BANDS = ((600, 1.0), (400, 0.7), (0, 0.4))
+
+
+def size_weight(box_height):
+    for min_height, weight in SIZE_BANDS:
+        if box_height > min_height:
+            return weight
+    return SIZE_BANDS[-1][1]
+
+
+def _head_region(image, width=128):
+    """Grayscale upper third of a person crop, resized to a fixed width so scores are comparable."""
+    head = image[:max(1, image.shape[0] // 3)]
+    if head.ndim == 3:
+        head = cv2.cvtColor(head, cv2.COLOR_BGR2GRAY)
+    h, w = head.shape[:2]
+    return cv2.resize(head, (width, max(1, int(h * width / max(1, w)))), interpolation=cv2.INTER_AREA)
+
+
+def sharpness(image):
+    """Laplacian variance of the head region (higher = sharper)."""
+    return cv2.Laplacian(_head_region(image), cv2.CV_64F).var()
+
+
+class FrontalFaceCheck:
+    """Cheap OpenCV Haar-cascade test for a frontal face in the head region."""
+
+    def __init__(self):
+        self.cascade = None
+        if hasattr(cv2, "CascadeClassifier"):
+            self.cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        else:
+            print("[WARN] This OpenCV build has no CascadeClassifier; frontal-face scoring disabled")
+
+    def __call__(self, image):
+        if self.cascade is None:
+            return True
+        head = _head_region(image, width=160)
+        faces = self.cascade.detectMultiScale(head, scaleFactor=1.2, minNeighbors=4, minSize=(20, 20))
+        return len(faces) > 0
+
+
+def score_capture(image, box_height, frontal_check=None):
+    """
+    Quality score for one person capture: head sharpness weighted by the
+    box-height band, boosted when `frontal_check` finds a frontal face.
+    """
+    score = sharpness(image) * size_weight(box_height)
+    if frontal_check is not None:
+        score *= 2.0 if frontal_check(image) else 0.5
+    return score
+
+
+# ------------------- Best Frame Buffer -------------------
+class BestFrameBuffer:
+    """
+    Keeps the K highest-scoring captures of one track while it is being captured.
+
+    Use would_keep(score) before copying a crop, then offer(score, capture).
+    """
+
+    def __init__(self, k=3):
+        self.k = k
+        self.heap = []      # min-heap of (score, seq, capture)
+        self.seq = 0
+        self.offered = 0
+
+    def would_keep(self, score):
+        return len(self.heap) < self.k or score > self.heap[0][0]
+
+    def offer(self, score, capture):
+        self.offered += 1
+        item = (score, self.seq, capture)
+        self.seq += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+            return True
+        if score > self.heap[0][0]:
+            heapq.heapreplace(self.heap, item)
+            return True
+        return False
+
+    def best(self):
+        """Kept captures, best first."""
+        return [capture for _, _, capture in sorted(self.heap, key=lambda x: (-x[0], x[1]))]
+
+    def __len__(self):
+        return len(self.heap)
@@ -0,0 +1,565 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import cv2
+
+from best_frames import BestFrameBuffer, FrontalFaceCheck, score_capture, sharpness
+from capture_writer import get_capture_writer
+from frame_grabber import FrameGrabber
+from frame_index import get_frame_index
+from motion_gate import motion_gate_from_env
+from recognition_queue import get_recognition_queue
+from retention import retention_from_config
+from tracker import Tracker
+from utilities.crypto_manager import CryptoManager
+
+EVENT_COOLDOWN = timedelta(seconds=60)
+MAX_EVENTS_PER_PERIOD = 3
+EVENT_PERIOD = timedelta(minutes=1)
+
+
+# ------------------- Camera Config -------------------
+class CameraConfig:
+    """
+    Settings for one camera.
+
+    Keys are the same names the single-camera container reads from its
+    environment (CAMERA_ID, RTSP_IPADDRESS, FRAME_TOP, THERSHOLD_TOP_START_Y, ...).
+    Anything missing from the dict falls back to the environment, then to
+    the usual default.
+    """
+
+    def __init__(self, values=None):
+        values = values or {}
+
+        def get(key, default=None):
+            value = values.get(key)
+            if value is None:
+                value = os.getenv(key, default)
+            return value
+
+        def flag(key, default="false"):
+            return str(get(key, default)).lower() in ("1", "true", "yes")
+
+        self.camera_id = get("CAMERA_ID", "LIFT")
+        base_ot = get("OT", "./../data/detected_frames")
+        self.output_dir = os.path.join(base_ot, self.camera_id)
+
+        credentials = get("RTSP_CREDENTIALS")
+        if credentials:
+            credentials = CryptoManager().decrypt(credentials)
+        ip_address = get("RTSP_IPADDRESS")
+        self.rtsp_url = get("RTSP_URL") or \
+            f"rtsp://{credentials}@{ip_address}/cam/realmonitor?channel=1&subtype=0"
+
+        self.frame_width = int(get("CAP_PROP_FRAME_WIDTH", 2560))
+        self.frame_height = int(get("CAP_PROP_FRAME_HEIGHT", 1440))
+        self.frame_top = int(get("FRAME_TOP", 100))
+        self.frame_bottom = int(get("FRAME_BOTTOM", 1900))
+        self.frame_left = int(get("FRAME_LEFT", 1075))
+        self.frame_right = int(get("FRAME_RIGHT", 1875))
+
+        self.threshold_top_start_x = int(get("THERSHOLD_TOP_START_X", 50))
+        self.threshold_top_start_y = int(get("THERSHOLD_TOP_START_Y", 550))
+        self.threshold_top_end_x = int(get("THERSHOLD_TOP_END_X", 1200))
+        self.threshold_bottom_start_x = int(get("THERSHOLD_BOTTOM_START_X", 50))
+        self.threshold_bottom_start_y = int(get("THERSHOLD_BOTTOM_START_Y", 1100))
+        self.threshold_bottom_end_x = int(get("THERSHOLD_BOTTOM_END_X", 1200))
+
+        self.no_human_frames_to_end = int(get("LIMIT_FRAME_COUNT_NO_HUMANS", 10))
+        self.min_frames_per_person = int(get("MIN_FRAMES_PER_PERSON", 5))
+        self.max_frames_per_person = int(get("MAX_FRAMES_PER_PERSON", 20))
+        self.capture_buffer_size = int(get("CAPTURE_BUFFER_SIZE", 1))
+        self.tracker_iou = float(get("TRACKER_IOU", 0.3))
+        self.tracker_max_age = int(get("TRACKER_MAX_AGE", 10))
+        self.tracker_min_hits = int(get("TRACKER_MIN_HITS", 1))
+        self.show_window = flag("SHOW_WINDOW")
+
+        # Captures go to recognition in memory; "disk" keeps the old JPEG round-trip.
+        self.capture_handoff = str(get("CAPTURE_HANDOFF", "memory")).lower()
+        self.save_captures = flag("SAVE_CAPTURES")   # audit copy of in-memory captures
+        self.capture_margin = float(get("CAPTURE_MARGIN", 0.1))
+        # Only the best K of the (up to MAX_FRAMES_PER_PERSON) scored captures are kept
+        self.best_frames_k = int(get("BEST_FRAMES_K", 3))
+        self.best_frames_frontal = flag("BEST_FRAMES_FRONTAL")
+
+        # Age/size budget of output_dir, enforced in the background (0 disables a limit)
+        self.retention_max_mb = int(get("RETENTION_MAX_MB", 2048))
+        self.retention_max_age_minutes = int(get("RETENTION_MAX_AGE_MINUTES", 120))
+        self.retention_interval = float(get("RETENTION_INTERVAL_SECONDS", 60))
+        self.retention_batch_size = int(get("RETENTION_BATCH_SIZE", 200))
+
+        # Dual-stream mode: detect on the low-res sub-stream, crop from the main stream.
+        self.dual_stream = flag("DUAL_STREAM")
+        sub_subtype = int(get("SUB_STREAM_SUBTYPE", 1))
+        self.sub_stream_url = get("SUB_STREAM_URL") or \
+            self.rtsp_url.replace("subtype=0", f"subtype={sub_subtype}")
+        self.main_stream_buffer = int(get("MAIN_STREAM_BUFFER", 10))
+        # The buffer grows with the detection lag up to this many frames (~11 MB each at 4MP)
+        self.main_stream_buffer_max = int(get("MAIN_STREAM_BUFFER_MAX", 40))
+        # No main-stream frame close enough: crop from the sub-stream frame, upscaled
+        self.main_stream_fallback = flag("MAIN_STREAM_FALLBACK", "true")
+        self.main_stream_max_skew = float(get("MAIN_STREAM_MAX_SKEW_MS", 150)) / 1000
+        self.main_stream_offset = float(get("MAIN_STREAM_OFFSET_MS", 0)) / 1000
+        self.main_stream_linger = float(get("MAIN_STREAM_LINGER_SECONDS", 10))
+
+    @classmethod
+    def from_env(cls):
+        return cls({})
+
+
+# ------------------- Save Frame -------------------
+def save_frame(frame, photo_id, frame_num, total_humans,
+               frame_top, frame_bottom, frame_left, frame_right, output_dir, box=None,
+               capture_ts=None, track_id=None, sharpness=None):
+    """
+    Crop and save detected frame image (`box` = the person's box in ROI pixels).
+    The capture is recorded in the folder's manifest with its metadata.
+    """
+    # Crop the frame using region of interest (ROI); the writer gets its own copy
+    cropped = frame[frame_top:frame_bottom, frame_left:frame_right].copy()
+    capture_ts = capture_ts or time.time()
+
+    def on_written(filename):
+        # Recognition finds the event's files through the index instead of listing the folder
+        get_frame_index().add(filename, capture_ts, track_id, sharpness)
+
+    save_capture_image(cropped, photo_id, frame_num, total_humans, output_dir, box, on_written)
+
+
+def save_capture_image(image, photo_id, frame_num, total_humans, output_dir, box=None, on_written=None):
+    """
+    Queue an already-cropped capture for writing as
+    <photo_id>_<frame_num>_<total_humans>.<ext>, or
+    <photo_id>_<frame_num>_<total_humans>_<x1>-<y1>-<x2>-<y2>.<ext> when the
+    person box is known, so recognition can search only the head region.
+    The capture writer encodes it off this thread (CAPTURE_FORMAT, default
+    jpg) and calls on_written(filename) once it is on disk.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    writer = get_capture_writer()
+
+    # Construct filename
+    suffix = "_" + "-".join(str(int(v)) for v in box) if box is not None else ""
+    filename = f"{output_dir}/{photo_id}_{frame_num:02d}_{total_humans}{suffix}.{writer.extension}"
+
+    # Encode + write in the writer pool (may coalesce or drop when it falls behind)
+    writer.submit(f"{output_dir}/{photo_id}", image, filename, on_written)
+    return filename
+
+
+def padded_box(frame, box, margin=0.1):
+    """The person box (full-frame x1, y1, x2, y2) padded by `margin` and clipped to the frame."""
+    x1, y1, x2, y2 = box
+    mx, my = int((x2 - x1) * margin), int((y2 - y1) * margin)
+    h, w = frame.shape[:2]
+    return max(0, x1 - mx), max(0, y1 - my), min(w, x2 + mx), min(h, y2 + my)
+
+
+def person_crop(frame, box, margin=0.1, copy=True):
+    """Cut the person box (full-frame x1, y1, x2, y2) out of frame, padded by `margin`."""
+    x1, y1, x2, y2 = padded_box(frame, box, margin)
+    crop = frame[y1:y2, x1:x2]
+    return crop.copy() if copy else crop
+
+
+# ------------------- Camera Pipeline -------------------
+class CameraPipeline:
+    """
+    Capture, event detection and frame saving for one camera.
+
+    The pipeline owns the camera's capture thread(s) and event state; person
+    detection is delegated to a (possibly shared) YOLOWorker, with the
+    camera_id as the source key.
+    """
+
+    def __init__(self, config, detector):
+        self.cfg = config
+        self.detector = detector
+        self.camera_id = config.camera_id
+        os.makedirs(config.output_dir, exist_ok=True)
+
+        self.grabber = None
+        self.main_grabber = None       # dual-stream only: opened while people are around
+        self.retention = None
+        self.main_stream_needed_ts = 0.0
+        self.detection_lag = 0.0       # smoothed capture -> detection delay, sizes the main-stream buffer
+        self.main_stream_hits = 0
+        self.main_stream_misses = 0    # detections with no main-stream frame within max skew
+        self.main_stream_missing = False
+        self.pending_frames = {}       # frame_id -> full frame awaiting its detections
+        self.motion_gate = motion_gate_from_env()  # None unless MOTION_GATE=true
+        self.frontal_check = FrontalFaceCheck() if config.best_frames_frontal else None
+        self.recognizer = get_recognition_queue()
+        self.backpressure = False      # recognition backlog too deep: hold off new captures
+        self.stop_requested = False
+        self.last_heartbeat = datetime.now() - timedelta(minutes=5)
+        self.frame_id = None
+        self.capture_ts = None
+        self.scale = (1.0, 1.0)
+
+        # --- Event & tracking state ---
+        self.event_active = False
+        self.event_id = None
+        self.event_count = 0
+        self.event_window_start = datetime.min
+        self.tracker = Tracker(config.tracker_iou, config.tracker_max_age, config.tracker_min_hits)
+        self.persons = {}  # track_id -> capture state of that person in the current event
+        self.no_human_frames = 0
+
+    def start(self):
+        cfg = self.cfg
+        if cfg.capture_handoff == "disk":
+            # Frames saved before a restart whose job was never queued
+            self.recognizer.recover_folder(cfg.output_dir, self.camera_id)
+        self.retention = retention_from_config(cfg, self._retention_protected)
+        if self.retention is not None:
+            self.retention.start()
+        if cfg.dual_stream:
+            self.grabber = FrameGrabber(cfg.sub_stream_url, buffer_size=cfg.capture_buffer_size,
+                                        name=f"{self.camera_id}-sub").start()
+        else:
+            self.grabber = FrameGrabber(cfg.rtsp_url, cfg.frame_width, cfg.frame_height,
+                                        buffer_size=cfg.capture_buffer_size,
+                                        name=self.camera_id).start()
+        return self
+
+    def stop(self):
+        self.grabber.stop()
+        if self.retention is not None:
+            self.retention.stop()
+        if self.main_grabber is not None:
+            self.main_grabber.stop()
+
+    # --------------------------------------------------------
+    def _roi(self, frame):
+        cfg = self.cfg
+        if cfg.dual_stream:
+            # ROI and thresholds are configured in main-stream pixels
+            fx = frame.shape[1] / cfg.frame_width
+            fy = frame.shape[0] / cfg.frame_height
+            self.scale = (fx, fy)
+            return frame[int(cfg.frame_top * fy):int(cfg.frame_bottom * fy),
+                         int(cfg.frame_left * fx):int(cfg.frame_right * fx)]
+        return frame[cfg.frame_top:cfg.frame_bottom, cfg.frame_left:cfg.frame_right]
+
+    def _retention_protected(self, folder):
+        """Events retention must not touch: the one being captured and those waiting for recognition."""
+        events = self.recognizer.active_events(folder)
+        event_id = self.event_id
+        if event_id is not None:
+            events.add(event_id)
+        return events
+
+    def submit(self, timeout=1.0):
+        """Grab the newest frame and queue it for detection. Returns True if a frame was read."""
+        frame_id, capture_ts, frame = self.grabber.read(timeout=timeout)
+        if frame is None or frame.size == 0:
+            return False
+        self.frame_id, self.capture_ts = frame_id, capture_ts
+
+        _frame = self._roi(frame)
+        self.heartbeat()
+
+        # YOLO inference (results are joined back to their own frame by frame_id).
+        # With motion gating, a static ROI skips YOLO unless an event is running.
+        motion = self.motion_gate.check(_frame) if self.motion_gate is not None else True
+        if motion or self.event_active:
+            self.pending_frames[frame_id] = frame
+            if len(self.pending_frames) > 32:
+                del self.pending_frames[min(self.pending_frames)]
+            self.detector.infer_async(frame_id, capture_ts, _frame, source=self.camera_id)
+        return True
+
+    def heartbeat(self):
+        current_time = datetime.now()
+        if (current_time - self.last_heartbeat).total_seconds() < 300:
+            return
+        cap_stats = self.grabber.stats()
+        detector = self.detector
+        print(f"[INFO] {self.camera_id} working at: {current_time} | frame {self.frame_id} "
+              f"age {(time.time() - self.capture_ts) * 1000:.0f}ms | "
+              f"captured {cap_stats['captured']} dropped {cap_stats['dropped']} | "
+              f"yolo wait {detector.avg_queue_wait * 1000:.0f}ms "
+              f"infer {detector.avg_infer_time * 1000:.0f}ms "
+              f"batch {detector.avg_batch_size:.1f} "
+              f"dropped {detector.dropped_in}/{detector.dropped_out}")
+        recognizer = self.recognizer
+        print(f"[INFO] Recognition queue: depth {recognizer.depth()} "
+              f"done {recognizer.completed} retried {recognizer.retried} failed {recognizer.failed}")
+        if self.cfg.capture_handoff == "disk" or self.cfg.save_captures:
+            writer = get_capture_writer()
+            print(f"[INFO] Capture writer: written {writer.written}/{writer.submitted} "
+                  f"coalesced {writer.coalesced} dropped {writer.dropped} failed {writer.failed}")
+        if self.cfg.dual_stream:
+            print(f"[INFO] {self.camera_id} main stream: matched {self.main_stream_hits} "
+                  f"missed {self.main_stream_misses} | detection lag {self.detection_lag * 1000:.0f}ms")
+        if self.motion_gate is not None:
+            print(f"[INFO] {self.camera_id} motion gate: passed {self.motion_gate.frames_passed} "
+                  f"gated {self.motion_gate.frames_gated}")
+        self.last_heartbeat = current_time
+
+    def step(self, timeout=1.0):
+        """Submit the newest frame and process one finished detection, if any."""
+        read = self.submit(timeout)
+        result = self.detector.get_results(self.camera_id)
+        if result is None:
+            return read
+        self.process(result)
+        return True
+
+    # --------------------------------------------------------
+    def _person_boxes(self, result):
+        # Collect human boxes
+        return [(x1, y1, x2, y2) for (x1, y1, x2, y2, conf) in result["boxes"] if conf > 0.5]
+
+    def _crop_frame(self, frame, result, human_detected):
+        """Frame to crop captures from; in dual-stream mode the time-aligned main-stream frame."""
+        cfg = self.cfg
+        if not cfg.dual_stream:
+            return frame
+
+        # Decode the 4MP main stream only while people are around
+        if human_detected or self.event_active:
+            self.main_stream_needed_ts = time.time()
+            if self.main_grabber is None:
+                self.main_grabber = FrameGrabber(cfg.rtsp_url, cfg.frame_width, cfg.frame_height,
+                                                 buffer_size=cfg.main_stream_buffer,
+                                                 name=f"{self.camera_id}-main").start()
+        elif self.main_grabber is not None and \
+                time.time() - self.main_stream_needed_ts > cfg.main_stream_linger:
+            threading.Thread(target=self.main_grabber.stop, daemon=True).start()
+            self.main_grabber = None
+
+        if self.main_grabber is None or not human_detected:
+            return None
+        self._size_main_buffer()
+        _, _, crop_frame = self.main_grabber.nearest(result["capture_ts"] + cfg.main_stream_offset,
+                                                     cfg.main_stream_max_skew)
+        if crop_frame is not None:
+            self.main_stream_hits += 1
+            if self.main_stream_missing:
+                self.main_stream_missing = False
+                print(f"[INFO] {self.camera_id} main-stream frames matched again")
+            return crop_frame
+
+        self.main_stream_misses += 1
+        if not self.main_stream_missing:
+            self.main_stream_missing = True
+            print(f"[WARN] {self.camera_id} no main-stream frame within "
+                  f"{cfg.main_stream_max_skew * 1000:.0f}ms of the detection (lag {self.detection_lag * 1000:.0f}ms, "
+                  f"buffer {self.main_grabber.buffer.maxlen} frames)"
+                  + (", cropping from the upscaled sub stream" if cfg.main_stream_fallback else ", skipping captures"))
+        if not cfg.main_stream_fallback:
+            return None
+        return cv2.resize(frame, (cfg.frame_width, cfg.frame_height), interpolation=cv2.INTER_LINEAR)
+
+    def _size_main_buffer(self):
+        """Keep enough main-stream frames to reach back past the detection lag."""
+        cfg = self.cfg
+        fps = self.main_grabber.fps()
+        if not fps:
+            return
+        reach = self.detection_lag + cfg.main_stream_max_skew + abs(cfg.main_stream_offset)
+        needed = min(cfg.main_stream_buffer_max, max(cfg.main_stream_buffer, int(reach * fps * 1.25) + 2))
+        if needed > self.main_grabber.buffer.maxlen:
+            print(f"[INFO] {self.camera_id} main-stream buffer {self.main_grabber.buffer.maxlen} -> {needed} frames "
+                  f"(detection lag {self.detection_lag * 1000:.0f}ms at {fps:.0f} fps)")
+            self.main_grabber.resize(needed)
+
+    def process(self, result):
+        """Run the event logic on one detection envelope."""
+        cfg = self.cfg
+        frame = self.pending_frames.pop(result["frame_id"], None)
+        for stale_id in [fid for fid in self.pending_frames if fid < result["frame_id"]]:
+            del self.pending_frames[stale_id]
+        if frame is None:
+            return
+        _frame = result["frame"]
+        detection_lag = time.time() - result["capture_ts"]
+        # Rises at once, decays slowly, so a lag spike does not outrun the main-stream buffer
+        self.detection_lag = max(detection_lag, 0.95 * self.detection_lag + 0.05 * detection_lag)
+
+        person_boxes = self._person_boxes(result)
+        if cfg.dual_stream:
+            # Map sub-stream ROI boxes into main-stream ROI coordinates so the
+            # bands and size levels below keep working unchanged.
+            fx, fy = self.scale
+            ox, oy = int(cfg.frame_left * fx), int(cfg.frame_top * fy)
+            person_boxes = [(int((x1 + ox) / fx) - cfg.frame_left, int((y1 + oy) / fy) - cfg.frame_top,
+                             int((x2 + ox) / fx) - cfg.frame_left, int((y2 + oy) / fy) - cfg.frame_top)
+                            for (x1, y1, x2, y2) in person_boxes]
+            if cfg.show_window:
+                _frame = cv2.resize(_frame, (min(cfg.frame_right, cfg.frame_width) - cfg.frame_left,
+                                             min(cfg.frame_bottom, cfg.frame_height) - cfg.frame_top))
+        total_humans = len(person_boxes)
+        human_detected = total_humans > 0
+        crop_frame = self._crop_frame(frame, result, human_detected)
+
+        saturated = self.recognizer.saturated()
+        if saturated != self.backpressure:
+            self.backpressure = saturated
+            if saturated:
+                print(f"[WARN] {self.camera_id} recognition backlog at {self.recognizer.depth()} jobs, "
+                      f"pausing captures")
+            else:
+                print(f"[INFO] {self.camera_id} recognition backlog drained, resuming captures")
+
+        # --- EVENT START detection ---
+        now = datetime.now()
+        # Reset event window if expired
+        if now - self.event_window_start > EVENT_PERIOD:
+            self.event_window_start = now
+            self.event_count = 0
+
+        # Start event only if at least one human is inside vertical band
+        band_top, band_bottom = cfg.threshold_top_start_y, cfg.threshold_bottom_start_y
+        person_in_band = any(band_top < int((y1 + y2) / 2) < band_bottom
+                             for (x1, y1, x2, y2) in person_boxes)
+
+        if person_in_band and not self.event_active:
+            if self.event_count < MAX_EVENTS_PER_PERIOD or now - self.event_window_start > EVENT_PERIOD:
+                self.event_active = True
+                self.event_id = datetime.now().strftime("%y%m%d%H%M%S%f")[:-3]
+                self.event_count += 1
+                self.persons = {}
+                self.no_human_frames = 0
+                print(f"[EVENT] {self.camera_id} started {self.event_id} — human entered target zone.")
+
+        # Track every person (in band or not) so ids stay stable across the frame
+        tracked = self.tracker.update(person_boxes)
+
+        # --- EVENT PROCESSING ---
+        overlays = []   # (box, color, thickness, label) drawn on a copy for the window only
+        if self.event_active:
+            for track_id, (x1, y1, x2, y2) in tracked:
+                cy = int((y1 + y2) / 2)
+
+                # Only capture if inside band
+                if not (band_top < cy < band_bottom):
+                    overlays.append(((x1, y1, x2, y2), (100, 100, 100), 1, None))
+                    continue
+
+                now = datetime.now()
+                person = self.persons.get(track_id)
+                if person is None:
+                    # New person
+                    person = {
+                        "track_id": track_id,
+                        "saved": 0,
+                        "photo_id": f"{self.event_id}_{len(self.persons)+1}",
+                        "first_seen": now,
+                        "last_saved_ts": datetime.min,
+                        "captures": BestFrameBuffer(cfg.best_frames_k),
+                    }
+                    self.persons[track_id] = person
+                person["box"] = (x1, y1, x2, y2)
+                person["last_seen"] = now
+
+                # In dual-stream mode the main stream may still be warming up
+                if crop_frame is not None and not saturated and person["saved"] < cfg.max_frames_per_person \
+                        and (now - person["last_saved_ts"]).total_seconds() > 0.5:
+                    self._capture(person, crop_frame, total_humans, result["capture_ts"], now)
+                    print(f"[CAPTURE] Frame {person['saved']} for {person['photo_id']} "
+                          f"(track {track_id}, frame {result['frame_id']}, "
+                          f"lag {detection_lag * 1000:.0f}ms)")
+
+                # Box + distance info for the window
+                h = y2 - y1
+                if h > 600: level, color = "Very Close", (0,255,0)
+                elif h > 400: level, color = "Medium", (0,255,255)
+                else: level, color = "Far", (0,0,255)
+                overlays.append(((x1, y1, x2, y2), color, 2, f"{level} {h}px"))
+
+        # --- EVENT END detection ---
+        if not human_detected and self.event_active:
+            self.no_human_frames += 1
+            if self.no_human_frames >= cfg.no_human_frames_to_end:
+                self.end_event()
+        else:
+            if human_detected:
+                self.no_human_frames = 0
+
+        if cfg.show_window:
+            # Drawn on a copy once every capture is taken: _frame shares pixels with crop_frame
+            self.display(_frame.copy(), total_humans, overlays)
+
+    def _capture(self, person, crop_frame, total_humans, capture_ts, now):
+        """Offer one capture of `person` from crop_frame (to its top-K buffer, or as a JPEG with the disk hand-off)."""
+        cfg = self.cfg
+        person["saved"] += 1
+        person["last_saved_ts"] = now
+        x1, y1, x2, y2 = person["box"]
+        frame_box = (x1 + cfg.frame_left, y1 + cfg.frame_top, x2 + cfg.frame_left, y2 + cfg.frame_top)
+        image = person_crop(crop_frame, frame_box, cfg.capture_margin, copy=False)
+        if cfg.capture_handoff == "disk":
+            save_frame(crop_frame, person["photo_id"], person["saved"], total_humans,
+                       cfg.frame_top, cfg.frame_bottom, cfg.frame_left, cfg.frame_right,
+                       cfg.output_dir, person["box"], capture_ts, person["track_id"], sharpness(image))
+            return
+
+        # Person box inside the padded crop, for the head-region face search
+        px1, py1, _, _ = padded_box(crop_frame, frame_box, cfg.capture_margin)
+        face_box = (frame_box[0] - px1, frame_box[1] - py1, frame_box[2] - px1, frame_box[3] - py1)
+        # Score while capturing; only crops that make the top K are copied and kept
+        score = score_capture(image, y2 - y1, self.frontal_check)
+        if not person["captures"].would_keep(score):
+            return
+        image = image.copy()
+        person["captures"].offer(score, {
+            "image": image,
+            "score": score,
+            "frame_num": person["saved"],
+            "person_count": total_humans,
+            "box": person["box"],
+            "face_box": face_box,
+            "capture_ts": capture_ts,
+            "datetime": datetime.fromtimestamp(capture_ts),
+        })
+        if cfg.save_captures:
+            save_capture_image(image, person["photo_id"], person["saved"], total_humans,
+                               os.path.join(cfg.output_dir, "audit"))
+
+    def end_event(self):
+        cfg = self.cfg
+        print(f"[EVENT] {self.camera_id} ending {self.event_id}, "
+              f"launching recognition for {len(self.persons)} persons")
+        for person in self.persons.values():
+            if person["saved"] < cfg.min_frames_per_person:
+                continue
+            if cfg.capture_handoff == "disk":
+                # Queued once the person's last captures are on disk; never waits here.
+                # Reserved now so retention keeps the files until the job is persisted.
+                self.recognizer.reserve(person["photo_id"], cfg.output_dir)
+                get_capture_writer().when_written(
+                    f"{cfg.output_dir}/{person['photo_id']}",
+                    lambda photo_id=person["photo_id"]: self.recognizer.submit(
+                        photo_id, device_id=self.camera_id, folder=cfg.output_dir, reserved=True))
+            else:
+                self.recognizer.submit(person["photo_id"], person["captures"].best(), self.camera_id)
+        self.event_active = False
+        self.event_id = None
+        self.persons = {}
+        self.no_human_frames = 0
+
+    def display(self, _frame, total_humans, overlays=()):
+        cfg = self.cfg
+        for (x1, y1, x2, y2), color, thickness, label in overlays:
+            cv2.rectangle(_frame, (x1, y1), (x2, y2), color, thickness)
+            if label:
+                cv2.putText(_frame, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        cv2.putText(_frame, f"Humans: {total_humans}", (20,40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,255), 2)
+        cv2.line(_frame, (cfg.threshold_top_start_x, cfg.threshold_top_start_y),
+                 (cfg.threshold_top_end_x, cfg.threshold_top_start_y), (0,0,255), 2)
+        cv2.line(_frame, (cfg.threshold_bottom_start_x, cfg.threshold_bottom_start_y),
+                 (cfg.threshold_bottom_end_x, cfg.threshold_bottom_start_y), (0,0,255), 2)
+
+        if _frame is not None and _frame.size != 0:
+            _frame = cv2.resize(_frame, (1000,800))
+            cv2.imshow(f"YOLOv8 Human Detection (Event) - {self.camera_id}", _frame)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord("q"):
+                self.stop_requested = True
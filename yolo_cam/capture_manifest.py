@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+MANIFEST_NAME = "captures.jsonl"
+
+
+# ------------------- Capture Manifest -------------------
+class CaptureManifest:
+    """
+    Append-only log of the captures saved in one camera's hand-off folder.
+
+    Every crop written by save_frame() appends one JSON line (event_id,
+    photo_id, track_id, frame_no, capture_ts, bbox, sharpness, person_count,
+    file); an event whose files have been processed and deleted appends a
+    {"event_id": ..., "deleted": true} tombstone. Readers replay the log
+    instead of parsing names, stat'ing files or calling exiftool, and
+    compact() rewrites it with only the live records.
+    """
+
+    def __init__(self, folder, name=MANIFEST_NAME, compact_after=1000):
+        self.folder = folder
+        self.path = os.path.join(folder, name)
+        self.compact_after = compact_after   # tombstones appended before the log is rewritten
+        self.tombstones = 0
+        self.lock = threading.Lock()
+        self.fh = None
+
+    def _open(self):
+        if self.fh is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self.fh = open(self.path, "a", encoding="utf-8")
+        return self.fh
+
+    def _write(self, entry):
+        fh = self._open()
+        fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        fh.flush()
+
+    def append(self, event_id, photo_id, frame_no, capture_ts, filename, person_count,
+               bbox=None, track_id=None, sharpness=None):
+        """Record one saved crop (`filename` relative to the folder)."""
+        entry = {
+            "event_id": event_id,
+            "photo_id": photo_id,
+            "track_id": track_id,
+            "frame_no": frame_no,
+            "capture_ts": round(capture_ts, 3),
+            "bbox": list(bbox) if bbox is not None else None,
+            "sharpness": round(float(sharpness), 2) if sharpness is not None else None,
+            "person_count": person_count,
+            "file": filename,
+        }
+        with self.lock:
+            self._write(entry)
+        return entry
+
+    def remove(self, event_id):
+        """Tombstone every capture of `event_id`."""
+        with self.lock:
+            self._write({"event_id": event_id, "deleted": True})
+            self.tombstones += 1
+            if self.tombstones >= self.compact_after:
+                self._rewrite(self._read_locked())
+
+    def _read_locked(self):
+        events = OrderedDict()
+        if not os.path.exists(self.path):
+            return events
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue   # torn last line after a crash
+                if entry.get("deleted"):
+                    events.pop(entry["event_id"], None)
+                else:
+                    events.setdefault(entry["event_id"], []).append(entry)
+        return events
+
+    def _rewrite(self, events):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for entries in events.values():
+                for entry in entries:
+                    fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+        os.replace(tmp, self.path)
+        self.tombstones = 0
+
+    def read(self):
+        """Live records grouped by event_id (OrderedDict, oldest event first)."""
+        with self.lock:
+            return self._read_locked()
+
+    def compact(self, keep=None):
+        """
+        Rewrite the log with only live records, and only those for which
+        keep(entry) is true if given. Read and rewrite happen under one lock
+        hold, so no append is lost in between.
+        """
+        with self.lock:
+            events = self._read_locked()
+            if keep is not None:
+                for event_id in list(events):
+                    events[event_id] = [entry for entry in events[event_id] if keep(entry)]
+                    if not events[event_id]:
+                        del events[event_id]
+            self._rewrite(events)
+
+    def close(self):
+        with self.lock:
+            if self.fh is not None:
+                self.fh.close()
+                self.fh = None
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_capture_manifest(folder):
+    """The manifest of `folder` (one per folder per process)."""
+    key = os.path.abspath(folder)
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = _manifests[key] = CaptureManifest(folder)
+        return manifest
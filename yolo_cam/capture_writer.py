@@ -0,0 +1,181 @@
+import atexit
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Capture formats: file extension and OpenCV quality flag (None = raw numpy array)
+FORMATS = {
+    "jpg": ("jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "jpeg": ("jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": ("webp", cv2.IMWRITE_WEBP_QUALITY),
+    "npy": ("npy", None),
+}
+
+
+# ------------------- Capture Writer -------------------
+class CaptureWriter:
+    """
+    Encodes and writes capture images off the detection loop.
+
+    submit() only queues the image. A small pool of threads encodes it (JPEG,
+    WebP or raw .npy), writes `<path>.part` and renames it into place, so
+    readers never see a half-written file. The queue is bounded: when it is
+    full, a new capture replaces the latest waiting one of the same key (one
+    person of an event) if there is one (coalesced), and is dropped
+    otherwise. Both are counted. when_written(key, fn) runs fn once every
+    queued capture of that key is on disk, without blocking the caller.
+    With workers=0 captures are written inline.
+    """
+
+    def __init__(self, workers=2, queue_size=32, fmt="jpg", quality=95):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown capture format {fmt!r} (expected one of {', '.join(FORMATS)})")
+        self.extension, self.quality_flag = FORMATS[fmt]
+        self.quality = quality
+        self.queue_size = queue_size
+        self.cond = threading.Condition()
+        self.jobs = OrderedDict()   # seq -> [key, image, path, on_written], oldest first
+        self.seq = 0
+        self.in_flight = {}         # key -> captures queued or being written
+        self.waiters = {}           # key -> callbacks for when_written()
+        self.stopped = False
+        self.submitted = 0
+        self.written = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.threads = [threading.Thread(target=self._run, name=f"capture-writer-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, key, image, path, on_written=None):
+        """
+        Queue `image` (owned by the writer from now on) for `path`; returns
+        False if it was dropped. on_written(path) runs after the file exists.
+        """
+        if not self.threads:
+            self.submitted += 1
+            self._write_one(key, image, path, on_written)
+            return True
+        with self.cond:
+            self.submitted += 1
+            if self.stopped:
+                self.dropped += 1
+                return False
+            if len(self.jobs) >= self.queue_size:
+                waiting = next((job for job in reversed(self.jobs.values()) if job[0] == key), None)
+                if waiting is None:
+                    self.dropped += 1
+                    return False
+                # Behind: keep only the newest capture of this key
+                waiting[1:] = [image, path, on_written]
+                self.coalesced += 1
+                return True
+            self.seq += 1
+            self.jobs[self.seq] = [key, image, path, on_written]
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+            self.cond.notify()
+            return True
+
+    def when_written(self, key, fn):
+        """Run fn() once no capture of `key` is waiting or being written (now if none is)."""
+        with self.cond:
+            if self.in_flight.get(key):
+                self.waiters.setdefault(key, []).append(fn)
+                return
+        fn()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.jobs and not self.stopped:
+                    self.cond.wait()
+                if not self.jobs:
+                    return
+                _, (key, image, path, on_written) = self.jobs.popitem(last=False)
+            self._write_one(key, image, path, on_written)
+            with self.cond:
+                self.in_flight[key] -= 1
+                if self.in_flight[key]:
+                    continue
+                del self.in_flight[key]
+                callbacks = self.waiters.pop(key, [])
+                self.cond.notify_all()
+            for fn in callbacks:
+                self._call(fn)
+
+    def _write_one(self, key, image, path, on_written):
+        try:
+            self.write(image, path)
+        except Exception as e:
+            self.failed += 1
+            print(f"[ERROR] Could not write capture {path}: {e}")
+            return
+        self.written += 1
+        if on_written is not None:
+            self._call(on_written, path)
+
+    def _call(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"[ERROR] Capture writer callback failed: {e}")
+
+    def write(self, image, path):
+        """Encode and atomically write one image."""
+        tmp = path + ".part"
+        if self.quality_flag is None:
+            with open(tmp, "wb") as fh:
+                np.save(fh, image)
+        else:
+            ok, data = cv2.imencode(f".{self.extension}", image, [self.quality_flag, self.quality])
+            if not ok:
+                raise RuntimeError(f"{self.extension} encoding failed")
+            with open(tmp, "wb") as fh:
+                fh.write(data.tobytes())
+        os.replace(tmp, path)
+
+    def flush(self, timeout=None):
+        """Wait until every queued capture is written; False on timeout."""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.in_flight, timeout)
+
+    def close(self, timeout=10.0):
+        """Write what is queued and stop the worker threads."""
+        with self.cond:
+            if self.stopped:
+                return
+            self.stopped = True
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        print(f"[INFO] Capture writer closed: {self.written}/{self.submitted} written, "
+              f"{self.coalesced} coalesced, {self.dropped} dropped, {self.failed} failed")
+
+
+_capture_writer = None
+_capture_writer_lock = threading.Lock()
+
+
+def get_capture_writer():
+    """Process-wide writer (started on first use, drained at interpreter exit)."""
+    global _capture_writer
+    with _capture_writer_lock:
+        if _capture_writer is None:
+            _capture_writer = CaptureWriter(
+                workers=int(os.getenv("CAPTURE_WRITER_WORKERS", 2)),
+                queue_size=int(os.getenv("CAPTURE_WRITER_QUEUE", 32)),
+                fmt=os.getenv("CAPTURE_FORMAT", "jpg").lower(),
+                quality=int(os.getenv("CAPTURE_QUALITY", 95)),
+            )
+            atexit.register(_capture_writer.close)
+        return _capture_writer
+
+
+def close_capture_writer():
+    if _capture_writer is not None:
+        _capture_writer.close()
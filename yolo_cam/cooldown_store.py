@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+# ------------------- Shared Attendance Cooldown -------------------
+class CooldownStore:
+    """
+    Attendance cooldown shared by every camera container.
+
+    The last accepted attendance per guest lives in the `last_attendance`
+    table. claim() decides atomically, with one conditional upsert, whether a
+    sighting is outside the cooldown of the last one from any device, and
+    records it if so. A small LRU of recent timestamps (entries expire after
+    the cooldown) answers repeated sightings of the same guest without
+    touching the DB.
+    """
+
+    def __init__(self, db_path, cooldown_seconds=30, cache_size=1024, busy_timeout_ms=5000):
+        self.cooldown = cooldown_seconds
+        self.cache_size = cache_size
+        self.cache = OrderedDict()   # guest_id -> last accepted ts (epoch seconds)
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.db_checks = 0
+        self.db = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000.0, check_same_thread=False)
+        self.db.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS last_attendance (
+            guest_id    VARCHAR(20) PRIMARY KEY,
+            device_id   VARCHAR(50),
+            ts          REAL NOT NULL
+        )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_last_attendance_ts ON last_attendance(ts)")
+        self.db.commit()
+
+    def _remember(self, guest_id, ts):
+        self.cache[guest_id] = ts
+        self.cache.move_to_end(guest_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def claim(self, guest_id, device_id, ts):
+        """
+        True if guest_id may be marked at `ts` (a datetime); the sighting is
+        then recorded as the guest's latest. False while within the cooldown
+        of the last accepted sighting on any camera.
+        """
+        ts = ts.timestamp()
+        with self.lock:
+            cached = self.cache.get(guest_id)
+            if cached is not None and abs(ts - cached) < self.cooldown:
+                self.cache_hits += 1
+                return False
+
+            self.db_checks += 1
+            with self.db:
+                cur = self.db.execute("""
+                    INSERT INTO last_attendance (guest_id, device_id, ts) VALUES (?, ?, ?)
+                    ON CONFLICT(guest_id) DO UPDATE SET
+                        device_id = excluded.device_id,
+                        ts = MAX(last_attendance.ts, excluded.ts)
+                    WHERE ABS(excluded.ts - last_attendance.ts) >= ?
+                """, (guest_id, device_id, ts, self.cooldown))
+                accepted = cur.rowcount == 1
+                last = self.db.execute("SELECT ts FROM last_attendance WHERE guest_id = ?",
+                                       (guest_id,)).fetchone()[0]
+            self._remember(guest_id, last if not accepted else max(last, ts))
+            return accepted
+
+    def prune(self, older_than_seconds=86400):
+        """Drop rows no cooldown can depend on any more."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM last_attendance WHERE ts < strftime('%s','now') - ?",
+                            (older_than_seconds,))
+
+
+_cooldown_store = None
+_cooldown_store_lock = threading.Lock()
+
+
+def get_cooldown_store(db_path=None, cooldown_seconds=30):
+    """Process-wide store (created on first use)."""
+    global _cooldown_store
+    with _cooldown_store_lock:
+        if _cooldown_store is None:
+            _cooldown_store = CooldownStore(
+                db_path, cooldown_seconds,
+                cache_size=int(os.getenv("COOLDOWN_CACHE_SIZE", 1024)),
+                busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+            )
+            _cooldown_store.prune()
+        return _cooldown_store
@@ -0,0 +1,238 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+PERSON_CLASS_ID = 0
+
+
+# ------------------- Ultralytics (PyTorch / exported formats) -------------------
+class UltralyticsBackend:
+    """
+    Person detector on the ultralytics runtime.
+
+    Accepts anything YOLO() can load: yolov8n.pt, an exported .onnx file or
+    an *_openvino_model directory.
+    """
+
+    name = "ultralytics"
+
+    def __init__(self, model_path="yolov8n.pt", conf=0.5):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.conf = conf
+
+    def detect(self, frames):
+        """Return one list of (x1, y1, x2, y2, conf) person boxes per frame."""
+        results = self.model(frames, conf=self.conf, classes=[PERSON_CLASS_ID], verbose=False)
+        detections = []
+        for result in results:
+            boxes = []
+            for box in result.boxes:
+                if int(box.cls) != PERSON_CLASS_ID:
+                    continue
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                boxes.append((x1, y1, x2, y2, float(box.conf)))
+            detections.append(boxes)
+        return detections
+
+
+# ------------------- ONNX Runtime -------------------
+def letterbox(image, size):
+    """Resize keeping aspect ratio and pad to size x size. Returns (canvas, ratio, pad_x, pad_y)."""
+    h, w = image.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return canvas, ratio, pad_x, pad_y
+
+
+class OnnxRuntimeBackend:
+    """
+    Person detector running an exported YOLOv8 ONNX model (FP32 or INT8)
+    through ONNX Runtime.
+
+    `threads` sets intra-op threads so several cameras/recognizers can share
+    one CPU box predictably. With provider="openvino" the OpenVINO execution
+    provider is used when onnxruntime-openvino is installed.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path="yolov8n.onnx", conf=0.5, iou=0.45, threads=0, provider="cpu"):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("DETECTOR_BACKEND=onnxruntime needs the 'onnxruntime' package "
+                              "(or 'onnxruntime-openvino' for the openvino provider)") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+
+        providers = ["CPUExecutionProvider"]
+        if provider == "openvino" and "OpenVINOExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "OpenVINOExecutionProvider")
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, height, _ = model_input.shape
+        self.imgsz = height if isinstance(height, int) else 640
+        self.dynamic_batch = not isinstance(batch_dim, int)
+        self.conf = conf
+        self.iou = iou
+        print(f"[INFO] ONNX Runtime detector {model_path} on {self.session.get_providers()[0]} "
+              f"({self.imgsz}px, threads={threads or 'auto'})")
+
+    def _preprocess(self, frame):
+        canvas, ratio, pad_x, pad_y = letterbox(frame, self.imgsz)
+        blob = canvas[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+        return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, (ratio, pad_x, pad_y)
+
+    def _postprocess(self, output, frame_shape, letterbox_info):
+        ratio, pad_x, pad_y = letterbox_info
+        preds = output.T                       # (anchors, 4 + classes)
+        scores = preds[:, 4 + PERSON_CLASS_ID]
+        keep = scores > self.conf
+        if not np.any(keep):
+            return []
+        preds, scores = preds[keep], scores[keep]
+
+        cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        x1 = (cx - w / 2 - pad_x) / ratio
+        y1 = (cy - h / 2 - pad_y) / ratio
+        bw, bh = w / ratio, h / ratio
+
+        rects = np.stack([x1, y1, bw, bh], axis=1)
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), scores.tolist(), self.conf, self.iou)
+        height, width = frame_shape[:2]
+        boxes = []
+        for i in np.array(indices).reshape(-1):
+            bx, by, bw_i, bh_i = rects[i]
+            boxes.append((int(max(0, bx)), int(max(0, by)),
+                          int(min(width, bx + bw_i)), int(min(height, by + bh_i)),
+                          float(scores[i])))
+        return boxes
+
+    def detect(self, frames):
+        """Return one list of (x1, y1, x2, y2, conf) person boxes per frame."""
+        prepared = [self._preprocess(frame) for frame in frames]
+        if self.dynamic_batch:
+            batch = np.stack([blob for blob, _ in prepared])
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = [self.session.run(None, {self.input_name: blob[None]})[0][0]
+                       for blob, _ in prepared]
+        return [self._postprocess(output, frame.shape, info)
+                for output, frame, (_, info) in zip(outputs, frames, prepared)]
+
+
+# ------------------- Factory -------------------
+def create_backend(model_path=None, conf=0.5, backend=None, threads=None):
+    """
+    Build the detector backend selected by DETECTOR_BACKEND (ultralytics | onnxruntime | openvino).
+
+    Model path defaults to YOLO_MODEL and the thread count to DETECTOR_THREADS.
+    """
+    backend = (backend or os.getenv("DETECTOR_BACKEND", "ultralytics")).lower()
+    model_path = model_path or os.getenv("YOLO_MODEL", "yolov8n.pt")
+    threads = int(threads if threads is not None else os.getenv("DETECTOR_THREADS", 0))
+
+    if backend == "ultralytics":
+        return UltralyticsBackend(model_path, conf)
+    if backend in ("onnxruntime", "onnx"):
+        return OnnxRuntimeBackend(model_path, conf, threads=threads)
+    if backend == "openvino":
+        if os.path.isdir(model_path):
+            # ultralytics-exported *_openvino_model directory
+            return UltralyticsBackend(model_path, conf)
+        return OnnxRuntimeBackend(model_path, conf, threads=threads, provider="openvino")
+    raise ValueError(f"Unknown DETECTOR_BACKEND: {backend}")
+
+
+def calibration_images(folder, limit=200):
+    """Up to `limit` BGR images from a capture folder (walked recursively) for INT8 calibration."""
+    paths = []
+    for root, _, names in os.walk(folder):
+        paths += [os.path.join(root, name) for name in sorted(names)
+                  if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".npy"))]
+    # Spread the sample over the whole folder instead of the first event only
+    step = max(1, len(paths) // limit)
+    for path in paths[::step][:limit]:
+        image = np.load(path) if path.endswith(".npy") else cv2.imread(path)
+        if image is not None and image.ndim == 3:
+            yield image
+
+
+def quantize_int8(onnx_path, calibration_folder, int8_path=None, limit=200):
+    """
+    Static INT8 quantization (QDQ format, per-channel weights) of an exported
+    ONNX model, calibrated on saved captures.
+
+    Dynamic quantization leaves activations in float and produces ConvInteger
+    ops, which ONNX Runtime's CPU kernels often run slower than FP32; QDQ
+    models run as fused QLinearConv.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    model_input = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0]
+    size = model_input.shape[2] if isinstance(model_input.shape[2], int) else 640
+
+    class CaptureReader(CalibrationDataReader):
+        def __init__(self):
+            self.images = calibration_images(calibration_folder, limit)
+
+        def get_next(self):
+            image = next(self.images, None)
+            if image is None:
+                return None
+            canvas = letterbox(image, size)[0]
+            blob = canvas[:, :, ::-1].transpose(2, 0, 1)
+            return {model_input.name: np.ascontiguousarray(blob, dtype=np.float32)[None] / 255.0}
+
+    if next(calibration_images(calibration_folder, 1), None) is None:
+        raise ValueError(f"No calibration images (.jpg/.webp/.npy captures) found in {calibration_folder}")
+    int8_path = int8_path or os.path.splitext(onnx_path)[0] + ".int8.onnx"
+    quantize_static(onnx_path, int8_path, CaptureReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return int8_path
+
+
+def export_model(model_path="yolov8n.pt", fmt="onnx", int8=False, imgsz=640, calibration_folder=None):
+    """
+    Export a YOLO model for the CPU backends.
+
+    fmt="onnx" writes <name>.onnx (and <name>.int8.onnx when int8=True, via
+    static QDQ quantization calibrated on the captures in
+    `calibration_folder`, default OT); fmt="openvino" writes an
+    <name>_openvino_model directory.
+    """
+    from ultralytics import YOLO
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, int8=int8 and fmt == "openvino")
+    print(f"[INFO] Exported {model_path} -> {exported}")
+
+    if fmt == "onnx" and int8:
+        calibration_folder = calibration_folder or os.getenv("OT", "./../data/detected_frames")
+        int8_path = quantize_int8(exported, calibration_folder)
+        print(f"[INFO] Quantized {exported} -> {int8_path} (calibrated on {calibration_folder})")
+        return int8_path
+    return exported
+
+
+if __name__ == "__main__":
+    # python detector_backends.py yolov8n.pt onnx [int8 [calibration_folder]]
+    args = sys.argv[1:]
+    export_model(args[0] if args else "yolov8n.pt",
+                 args[1] if len(args) > 1 else "onnx",
+                 int8=len(args) > 2 and args[2] == "int8",
+                 calibration_folder=args[3] if len(args) > 3 else None)
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+# Imported lazily: in pool mode only the worker processes load dlib's models
+face_recognition = None
+
+
+def _init_worker():
+    """Load face_recognition (and with it dlib's HOG detector and ResNet encoder) once per process."""
+    global face_recognition
+    import face_recognition as fr
+    face_recognition = fr
+
+
+def head_region(image, box=None, head_ratio=0.45):
+    """
+    Upper part of the person box where the face should be.
+
+    `box` is the person's x1, y1, x2, y2 in image pixels (None = whole image).
+    Returns the head crop and its (x, y) offset in the image.
+    """
+    if box is None:
+        return image, (0, 0)
+    h, w = image.shape[:2]
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = int((x2 - x1) * 0.1), int((y2 - y1) * 0.05)
+    left, top = max(0, x1 - pad_x), max(0, y1 - pad_y)
+    right, bottom = min(w, x2 + pad_x), min(h, y1 + int((y2 - y1) * head_ratio))
+    if right <= left or bottom <= top:
+        return image, (0, 0)
+    return image[top:bottom, left:right], (left, top)
+
+
+def _encode(image, model="hog", upsample=1, detect_scale=1.0):
+    """
+    Face locations (top, right, bottom, left) and 128-d encodings of one RGB image.
+
+    With detect_scale < 1 the faces are searched on a downscaled copy and the
+    locations scaled back up, so encodings still come from full-resolution pixels.
+    """
+    if face_recognition is None:
+        _init_worker()
+    if detect_scale < 1.0:
+        small = cv2.resize(image, None, fx=detect_scale, fy=detect_scale, interpolation=cv2.INTER_AREA)
+        h, w = image.shape[:2]
+        locations = [(max(0, int(t / detect_scale)), min(w, int(r / detect_scale)),
+                      min(h, int(b / detect_scale)), max(0, int(l / detect_scale)))
+                     for t, r, b, l in face_recognition.face_locations(
+                         small, number_of_times_to_upsample=upsample, model=model)]
+    else:
+        locations = face_recognition.face_locations(image, number_of_times_to_upsample=upsample, model=model)
+    encodings = face_recognition.face_encodings(image, locations)
+    return locations, [np.asarray(enc, dtype=np.float32) for enc in encodings]
+
+
+# ------------------- Face Encoder -------------------
+class FaceEncoder:
+    """
+    Runs face detection + encoding off the main interpreter.
+
+    With processes > 0 a spawn-based process pool does the dlib work, so the
+    capture and YOLO threads keep the GIL while faces are being encoded.
+    Spawn re-imports the entry script in every worker (as __mp_main__), so
+    entry scripts import the project modules under their __main__ guard;
+    workers then load only this module, cv2, numpy and face_recognition.
+    With processes = 0 encoding runs in the calling thread (the old behaviour).
+    Images go in as RGB arrays; results come back as (locations, encodings).
+
+    When the person box is known, only its head region is searched (and sent
+    to the pool); locations are returned in the coordinates of the full image.
+    A pool broken by a dead worker (e.g. OOM-killed in dlib) is replaced and
+    the batch retried once, so later jobs do not all fail.
+    """
+
+    def __init__(self, processes=2, model="hog", upsample=1, head_ratio=0.45, detect_scale=1.0):
+        self.processes = processes
+        self.model = model
+        self.upsample = upsample
+        self.head_ratio = head_ratio
+        self.detect_scale = detect_scale
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.pool_restarts = 0
+        if processes > 0:
+            self.pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.processes,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker)
+
+    def _replace_pool(self, broken):
+        with self.pool_lock:
+            if self.pool is broken:   # another thread may have replaced it already
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._new_pool()
+                self.pool_restarts += 1
+                print(f"[WARN] Face encoder pool broken, restarted ({self.pool_restarts} restarts)")
+
+    def _run_pool(self, heads, args):
+        for attempt in range(2):
+            pool = self.pool
+            try:
+                futures = [pool.submit(_encode, head, *args) for head, _ in heads]
+                return [f.result() for f in futures]
+            except BrokenProcessPool:
+                self._replace_pool(pool)
+                if attempt:
+                    raise
+
+    def encode(self, image, box=None):
+        return self.encode_many([image], [box])[0]
+
+    def encode_many(self, images, boxes=None):
+        """Encode several images in parallel; results keep the input order."""
+        boxes = boxes or [None] * len(images)
+        heads = [head_region(image, box, self.head_ratio) for image, box in zip(images, boxes)]
+        args = (self.model, self.upsample, self.detect_scale)
+        if self.pool is None:
+            results = [_encode(head, *args) for head, _ in heads]
+        else:
+            results = self._run_pool(heads, args)
+
+        shifted = []
+        for (_, (ox, oy)), (locations, encodings) in zip(heads, results):
+            locations = [(t + oy, r + ox, b + oy, l + ox) for t, r, b, l in locations]
+            shifted.append((locations, encodings))
+        return shifted
+
+    def shutdown(self, wait=False):
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_face_encoder = None
+_face_encoder_lock = threading.Lock()
+
+
+def get_face_encoder():
+    """Process-wide encoder configured by FACE_ENCODER_PROCESSES / FACE_DETECTION_MODEL."""
+    global _face_encoder
+    with _face_encoder_lock:
+        if _face_encoder is None:
+            _face_encoder = FaceEncoder(
+                processes=int(os.getenv("FACE_ENCODER_PROCESSES", 2)),
+                model=os.getenv("FACE_DETECTION_MODEL", "hog"),
+                upsample=int(os.getenv("FACE_UPSAMPLE", 1)),
+                head_ratio=float(os.getenv("FACE_HEAD_RATIO", 0.45)),
+                detect_scale=float(os.getenv("FACE_DETECT_SCALE", 1.0)),
+            )
+        return _face_encoder
+
+
+def close_face_encoder():
+    """Wait for the encoder processes to exit (after the recognition workers have stopped)."""
+    if _face_encoder is not None:
+        _face_encoder.shutdown(wait=True)
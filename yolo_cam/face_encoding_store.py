@@ -0,0 +1,168 @@
+"""
+Binary storage of guest face encodings.
+
+guest_faces.encoding_blob holds each 128-d encoding as raw float32 bytes
+(512 bytes per row). The JSON text column is still written for older
+readers, but nothing here parses it with eval.
+
+Changes to guest_faces and to guests.status are logged by triggers into
+face_index_changes, so recognizers can update their in-memory index with
+just the deltas (see read_face_changes).
+
+Run directly to migrate an existing DB:
+    python face_encoding_store.py ../data/WhiteHouse.db
+"""
+import json
+import sys
+
+import numpy as np
+
+ENCODING_DIM = 128
+ENCODING_BYTES = ENCODING_DIM * 4
+
+
+def encoding_to_blob(encoding):
+    enc = np.asarray(encoding, dtype=np.float32).reshape(-1)
+    if enc.size != ENCODING_DIM:
+        raise ValueError(f"Expected a {ENCODING_DIM}-d encoding, got {enc.size} values")
+    return enc.tobytes()
+
+
+def ensure_encoding_blob_column(conn):
+    """
+    Add guest_faces.encoding_blob if missing and fill it for rows that only
+    have JSON text. Returns the number of rows converted.
+    """
+    cur = conn.cursor()
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(guest_faces)")]
+    if not columns:
+        return 0
+    if "encoding_blob" not in columns:
+        cur.execute("ALTER TABLE guest_faces ADD COLUMN encoding_blob BLOB")
+
+    rows = cur.execute("SELECT face_id, encoding FROM guest_faces WHERE encoding_blob IS NULL").fetchall()
+    converted = 0
+    for face_id, encoding_text in rows:
+        try:
+            blob = encoding_to_blob(json.loads(encoding_text))
+        except (TypeError, ValueError) as e:
+            print(f"[WARN] guest_faces row {face_id} has an unreadable encoding: {e}")
+            continue
+        cur.execute("UPDATE guest_faces SET encoding_blob = ? WHERE face_id = ?", (blob, face_id))
+        converted += 1
+    conn.commit()
+    if converted:
+        print(f"[INFO] Converted {converted} guest_faces encodings to binary")
+    return converted
+
+
+def insert_encoding(cursor, guest_id, encoding):
+    """Insert one encoding into guest_faces (binary + JSON text)."""
+    enc = np.asarray(encoding, dtype=np.float32).reshape(-1)
+    cursor.execute(
+        "INSERT INTO guest_faces (guest_id, encoding, encoding_blob) VALUES (?, ?, ?)",
+        (guest_id, json.dumps(enc.tolist()), encoding_to_blob(enc)),
+    )
+
+
+def blobs_to_matrix(blobs):
+    """Stack raw float32 blobs into an (N,128) matrix with one np.frombuffer call."""
+    if not blobs:
+        return np.zeros((0, ENCODING_DIM), dtype=np.float32)
+    return np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+
+def load_encodings(conn, where="", params=()):
+    """
+    (face_ids, guest_ids, (N,128) float32 matrix) for guest_faces joined to
+    guests, filtered by an optional SQL `where` clause on g./gf. columns.
+    Rows still without a blob (written by an older writer) are converted
+    from their JSON text on the fly.
+    """
+    sql = ("SELECT gf.face_id, gf.guest_id, gf.encoding_blob, gf.encoding FROM guest_faces AS gf "
+           "JOIN guests AS g ON gf.guest_id = g.guest_id")
+    if where:
+        sql += f" WHERE {where}"
+    rows = []
+    for face_id, gid, blob, encoding_text in conn.execute(sql, params):
+        if blob is None:
+            try:
+                blob = encoding_to_blob(json.loads(encoding_text))
+            except (TypeError, ValueError):
+                continue
+        if len(blob) == ENCODING_BYTES:
+            rows.append((face_id, gid, blob))
+    return ([face_id for face_id, _, _ in rows], [gid for _, gid, _ in rows],
+            blobs_to_matrix([blob for _, _, blob in rows]))
+
+
+# ------------------- Change Log -------------------
+def ensure_face_change_log(conn):
+    """Create the face_index_changes table and the triggers that fill it."""
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS face_index_changes (
+        change_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+        op          VARCHAR(10) CHECK(op IN ('face', 'guest')),
+        face_id     INTEGER,
+        guest_id    VARCHAR(20),
+        changed_on  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TRIGGER IF NOT EXISTS trg_guest_faces_insert AFTER INSERT ON guest_faces
+    BEGIN
+        INSERT INTO face_index_changes (op, face_id, guest_id) VALUES ('face', NEW.face_id, NEW.guest_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_guest_faces_delete AFTER DELETE ON guest_faces
+    BEGIN
+        INSERT INTO face_index_changes (op, face_id, guest_id) VALUES ('face', OLD.face_id, OLD.guest_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_guest_faces_update AFTER UPDATE OF encoding, encoding_blob, guest_id ON guest_faces
+    BEGIN
+        INSERT INTO face_index_changes (op, face_id, guest_id) VALUES ('face', NEW.face_id, NEW.guest_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_guests_status AFTER UPDATE OF status ON guests
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO face_index_changes (op, guest_id) VALUES ('guest', NEW.guest_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_guests_delete AFTER DELETE ON guests
+    BEGIN
+        INSERT INTO face_index_changes (op, guest_id) VALUES ('guest', OLD.guest_id);
+    END;
+    """)
+    conn.commit()
+
+
+def last_face_change(conn):
+    row = conn.execute("SELECT MAX(change_id) FROM face_index_changes").fetchone()
+    return row[0] or 0
+
+
+def read_face_changes(conn, since):
+    """(last change_id, changed face_ids, changed guest_ids) logged after `since`."""
+    face_ids, guest_ids = set(), set()
+    last = since
+    for change_id, op, face_id, guest_id in conn.execute(
+            "SELECT change_id, op, face_id, guest_id FROM face_index_changes WHERE change_id > ? "
+            "ORDER BY change_id", (since,)):
+        last = change_id
+        if op == "face":
+            face_ids.add(face_id)
+        else:
+            guest_ids.add(guest_id)
+    return last, face_ids, guest_ids
+
+
+def prune_face_changes(conn, keep_days=7):
+    conn.execute("DELETE FROM face_index_changes WHERE changed_on < datetime('now', ?)", (f"-{keep_days} days",))
+    conn.commit()
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python face_encoding_store.py <path to WhiteHouse.db>")
+    conn = sqlite3.connect(sys.argv[1])
+    ensure_encoding_blob_column(conn)
+    ensure_face_change_log(conn)
+    conn.close()
@@ -1,5 +1,4 @@
 import threading
-import face_recognition
 import sqlite3
 import numpy as np
 from datetime import datetime, timedelta
@@ -8,13 +7,22 @@ import cv2  # ✅ Needed for saving cropped faces
 from dotenv import load_dotenv
 from typing import Optional
 
+from face_encoder import get_face_encoder
+from face_encoding_store import (ensure_encoding_blob_column, ensure_face_change_log, last_face_change,
+                                 load_encodings, prune_face_changes, read_face_changes)
+from ann_index import build_face_index
+from attendance_writer import get_attendance_writer
+from cooldown_store import get_cooldown_store
+from frame_index import get_frame_index, parse_capture_name
+from identity_fusion import fuse_identity
+from known_face_index import KnownFaceIndex
 from utilities.environment_variables import load_environment
 from utilities.file_manager import FileManager
 # --------------------- CONFIG ---------------------
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "WhiteHouse.db")
 DB_LOCK = threading.Lock()
-cooldown = timedelta(seconds=30)
+cooldown = timedelta(seconds=int(os.getenv("ATTENDANCE_COOLDOWN_SECONDS", 30)))
 
 
 
@@ -32,92 +40,198 @@ os.makedirs(OT, exist_ok=True)
 # --------------------- Globals ---------------------
 known_faces_encodings = []
 known_faces_names = []
-last_seen = {}  # photo_id -> datetime of last attendance
 
 # --------------------- DB CONNECTION ---------------------
-DB = sqlite3.connect(DB_PATH, check_same_thread=False)
+# Opened on first use (_db), so importing this module never touches the DB
+DB = None
+_DB_OPEN_LOCK = threading.Lock()
 
 
 _tolerance = os.getenv("TOLERANCE")
 if _tolerance is None: _tolerance=float(0.50)
 else: _tolerance=float(_tolerance)  
+# Fused decisions below this confidence are recorded as "unknown". Any value
+# above 0 is stricter than TOLERANCE alone (0 keeps every match within it).
+_min_confidence = float(os.getenv("FUSION_MIN_CONFIDENCE", 0))
+# Captures encoded per person in disk hand-off (same setting as the in-memory buffer)
+_best_frames_k = int(os.getenv("BEST_FRAMES_K", 3))
+
+
+def _ensure_attendance_confidence(db):
+    """attendance.confidence holds the fused identity confidence of camera rows."""
+    try:
+        with DB_LOCK:
+            columns = [row[1] for row in db.execute("PRAGMA table_info(attendance)")]
+            if columns and "confidence" not in columns:
+                db.execute("ALTER TABLE attendance ADD COLUMN confidence REAL")
+                db.commit()
+    except Exception as e:
+        print(f"[WARN] Could not add attendance.confidence: {e}")
+
+
+def _db():
+    """The recognizer's connection to DB_PATH, opened (and migrated) on first use."""
+    global DB
+    with _DB_OPEN_LOCK:
+        if DB is None:
+            db = sqlite3.connect(DB_PATH, check_same_thread=False)
+            _ensure_attendance_confidence(db)
+            DB = db
+        return DB
+
+
+def set_db_path(path):
+    """Use another DB (e.g. a benchmark's copy); call before the first recognition."""
+    global DB, DB_PATH, FACE_INDEX_PATH, _encodings_migrated
+    with _DB_OPEN_LOCK:
+        if DB is not None:
+            DB.close()
+            DB = None
+        DB_PATH = path
+        FACE_INDEX_PATH = os.path.join(os.path.dirname(path), "WhiteHouse.faces.ivf.npz")
+        _encodings_migrated = False
 
 
 
 attendance_log = {}
 known_faces_encodings = []
 known_faces_names = []
-def load_known_faces():
-    """Load known face encodings from the DB."""
-    global known_faces_encodings, known_faces_names
-    known_faces_encodings = []
-    known_faces_names = []
+known_faces_index = KnownFaceIndex()
+_encodings_migrated = False
+_face_change_id = 0      # last face_index_changes row applied to known_faces_index
+_data_version = None     # PRAGMA data_version when the index was last checked
+_INDEX_LOCK = threading.Lock()   # held across read-modify-write of the index and _face_change_id
+ACTIVE_GUESTS = "g.status = 'active' or g.status = 'leave'"
+# Optional ANN index for large galleries (exact search below FACE_INDEX_MIN_SIZE or with FACE_INDEX=exact)
+FACE_INDEX = os.getenv("FACE_INDEX", "exact").lower()
+FACE_INDEX_PATH = os.path.join(os.path.dirname(DB_PATH), "WhiteHouse.faces.ivf.npz")
 
-    try:
-        cur = DB.cursor()
-        cur.execute("SELECT gf.guest_id, gf.encoding FROM guest_faces AS gf JOIN guests AS g ON gf.guest_id = g.guest_id WHERE (g.status = 'active' or g.status = 'leave')")
-        rows = cur.fetchall()
-    except Exception:
-        rows = []
 
-    for guest_id, encoding_str in rows:
-        encoding = np.array(eval(encoding_str), dtype="float32")
-        known_faces_encodings.append(encoding)
-        known_faces_names.append(guest_id)
+def _set_known_faces(index):
+    # Swap in the new index in one assignment so matching threads never see a half-built one
+    global known_faces_encodings, known_faces_names, known_faces_index
+    known_faces_index = index
+    known_faces_encodings = index.matrix
+    known_faces_names = list(index.guest_ids)
 
-    
-    print(f"[INFO] Loaded {len(known_faces_names)} known people")
+
+def load_known_faces():
+    """Load known face encodings (binary column) from the DB."""
+    global _encodings_migrated, _face_change_id, _data_version
+    with _INDEX_LOCK:
+        try:
+            db = _db()
+            with DB_LOCK:
+                if not _encodings_migrated:
+                    ensure_encoding_blob_column(db)
+                    ensure_face_change_log(db)
+                    prune_face_changes(db)
+                    _encodings_migrated = True
+                # Read the change position first: changes landing during the load are re-applied, not lost
+                _data_version = db.execute("PRAGMA data_version").fetchone()[0]
+                _face_change_id = last_face_change(db)
+                face_ids, names, matrix = load_encodings(db, ACTIVE_GUESTS)
+        except Exception as e:
+            print(f"[ERROR] Could not load known faces: {e}")
+            face_ids, names, matrix = [], [], None
+
+        _set_known_faces(build_face_index(matrix, names, face_ids, kind=FACE_INDEX, path=FACE_INDEX_PATH,
+                                          min_size=int(os.getenv("FACE_INDEX_MIN_SIZE", 20000)),
+                                          nprobe=int(os.getenv("FACE_IVF_NPROBE", 8))))
+    print(f"[INFO] Loaded {len(known_faces_names)} known people ({type(known_faces_index).__name__})")
+
+
+def refresh_known_faces():
+    """
+    Apply enrolments, deletions and guest status changes made since the last
+    load. PRAGMA data_version only changes when another connection commits,
+    so with nothing new this costs one pragma.
+
+    Reading the change log, applying it to the index and moving the change id
+    happen under one lock, so two workers refreshing at once cannot each
+    apply their delta to the same old index and drop the other's.
+    """
+    global _face_change_id, _data_version
+    if not _encodings_migrated:
+        load_known_faces()
+        return
+    with _INDEX_LOCK:
+        try:
+            db = _db()
+            with DB_LOCK:
+                version = db.execute("PRAGMA data_version").fetchone()[0]
+                if version == _data_version:
+                    return
+                last, face_ids, guest_ids = read_face_changes(db, _face_change_id)
+                if last == _face_change_id:
+                    _data_version = version
+                    return
+                added = ([], [], None)
+                if face_ids or guest_ids:
+                    face_marks = ",".join("?" * len(face_ids)) or "NULL"
+                    guest_marks = ",".join("?" * len(guest_ids)) or "NULL"
+                    added = load_encodings(
+                        db, f"({ACTIVE_GUESTS}) AND (gf.face_id IN ({face_marks}) OR gf.guest_id IN ({guest_marks}))",
+                        tuple(face_ids) + tuple(guest_ids))
+        except Exception as e:
+            print(f"[ERROR] Could not refresh known faces: {e}")
+            return
+
+        _set_known_faces(known_faces_index.with_changes(face_ids, guest_ids, added))
+        # Only now: a failed refresh leaves the change id (and version) behind and is retried
+        _data_version = version
+        _face_change_id = last
+    print(f"[INFO] Known faces updated: {len(face_ids)} faces / {len(guest_ids)} guests changed, "
+          f"{len(known_faces_index)} encodings loaded")
     
 
-def mark_attendance(photo_id, ts=datetime.now(), device_id="OUT", method="Face"):
-    device_id=os.getenv("CAMERA_ID")
-    # Cooldown check
-    if photo_id in last_seen and ts - last_seen[photo_id] < cooldown:
+def mark_attendance(photo_id, ts=None, device_id=None, method="Face", confidence=None):
+    if ts is None: ts = datetime.now()
+    if device_id is None: device_id = os.getenv("CAMERA_ID")
+    # Cooldown check, shared with the other camera containers through the DB.
+    # Unknown faces are different people, so they only cool down per camera.
+    key = photo_id if photo_id != "unknown" else f"unknown:{device_id}"
+    if not get_cooldown_store(DB_PATH, cooldown.total_seconds()).claim(key, device_id, ts):
         print(f"[ATTENDANCE] Skipping {photo_id} (within cooldown)")
         return False
 
-    with DB_LOCK:
-        cur = DB.cursor()
-        cur.execute(
-            "INSERT INTO attendance (guest_id, device_id, method, timestamp) VALUES (?,?,?,?)",
-            (photo_id, device_id, method, ts.isoformat())
-        )
-        DB.commit()
+    # Buffered: written with other rows in one transaction by the attendance writer
+    get_attendance_writer(DB_PATH).add(photo_id, device_id, method, ts.isoformat(), confidence)
 
-    last_seen[photo_id] = ts
     print(f"[ATTENDANCE] Marked {photo_id} at {ts.isoformat()}")
     return True
 
 
-def get_person_files(photo_id):
-    """Return all files for a given person ID."""
-    pattern = f"{photo_id}_"
-    files = []
-    if not os.path.exists(OT):
-        return files
-
-    for f in os.listdir(OT):
-        if f.startswith(pattern) and f.endswith(".jpg"):
-            full_path = os.path.join(OT, f)
-            # Extract file number and person count from filename
-            parts = f.replace(".jpg", "").split("_")
-            
-            file_num = int(parts[1])
-            person_count = int(parts[2])
-            date_time = datetime.fromtimestamp(os.path.getmtime(full_path))
-            files.append({
-                "path": full_path,
-                "file_num": file_num,
-                "person_count": person_count,
-                "datetime": date_time
-            })
-    files.sort(key=lambda x: x["person_count"], reverse=True)
+def get_person_files(photo_id, folder=None):
+    """Return all files for a given person ID (from the frame index when the folder is indexed)."""
+    folder = folder or OT
+    files = get_frame_index().files(folder, photo_id) if "_" not in photo_id else None
+    if files is None:
+        files = []
+        if not os.path.exists(folder):
+            return files
+        pattern = f"{photo_id}_"
+        for f in os.listdir(folder):
+            if f.startswith(pattern):
+                record = parse_capture_name(folder, f, os.path.getmtime(os.path.join(folder, f)))
+                if record is not None:
+                    files.append(record)
+    files.sort(key=lambda x: x["frame_no"], reverse=True)
     return files
 
 
 
 
 
+def load_capture(path):
+    """RGB image of a saved capture (.npy captures hold the raw BGR crop)."""
+    # cv2, not face_recognition: dlib is only loaded in the face encoder's processes
+    image = np.load(path) if path.lower().endswith(".npy") else cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise IOError(f"Could not read capture {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
 def get_best_images(files, top_n=3):
     """Return top N best (most stable) images from given file list."""
     if not files:
@@ -129,8 +243,11 @@ def get_best_images(files, top_n=3):
             return 0
         return cv2.Laplacian(image, cv2.CV_64F).var()
 
-    # Calculate sharpness for each file
+    # Calculate sharpness for each file (recorded in the capture manifest when saved)
     for f in files:
+        if f.get("sharpness") is not None:
+            f["clarity"] = f["sharpness"]
+            continue
         try:
             f["clarity"] = blur_score(f["path"])
         except Exception:
@@ -148,75 +265,12 @@ def get_best_images(files, top_n=3):
 # ---------------------------------------------------
 # FACE CROPPING + RECOGNITION
 # ---------------------------------------------------
-def run_face_recognition_Old(photo_id):
-    """Process saved frames -> detect faces -> save cropped -> encode + attendance."""
-    print(f"[THREAD] Starting recognition for Person {photo_id}...")
-
-    
-    files = get_person_files(photo_id)
-    #--------------------!IMP---------selected_files = select_top_images(files) #!IMPORTANT
-    selected_files = get_best_images(files) #!IMPORTANT
-
-
-    if not selected_files:
-        print(f"[THREAD] No files found for Person {photo_id}")
-        return
-
-    # Create subfolder for cropped faces
-    person_folder = os.path.join(OT, str(photo_id))
-    os.makedirs(person_folder, exist_ok=True)
-
-    if 'known_faces_encodings' not in globals() or not known_faces_encodings:
-        load_known_faces()
-    for f in selected_files:
-        image = face_recognition.load_image_file(f["path"])
-        face_locations = face_recognition.face_locations(image)
-        encodings = face_recognition.face_encodings(image, face_locations)
-        primary_name = os.path.splitext(os.path.basename(f["path"]))[0]
-        imgname = os.path.join(person_folder, f"{primary_name}.jpg")
-        cv2.imwrite(imgname, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
-        print(f"[INFO] Image saved: {imgname}")
-
-        for i, (loc, enc) in enumerate(zip(face_locations, encodings)):
-            top, right, bottom, left = loc
-            face_img = image[top:bottom, left:right]
+def run_face_recognition(photo_id, folder=None, device_id=None):
+    """Process saved frames -> detect faces -> save cropped -> encode + attendance.
 
-            # Save cropped face to subfolder
-            crop_name = os.path.join(person_folder, f"{primary_name}_face_{i+1}.jpg")
-            cv2.imwrite(crop_name, cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR))
-            print(f"[INFO] Cropped face saved: {crop_name}")
-            # Compare current encoding with known faces
-            matches = face_recognition.compare_faces(known_faces_encodings, enc, tolerance=_tolerance)
-            face_distances = face_recognition.face_distance(known_faces_encodings, enc)
-            best_match_index = np.argmin(face_distances) if len(face_distances) > 0 else None
-
-            if True in matches and best_match_index is not None:
-                person_name = known_faces_names[best_match_index]
-                print(f"[INFO] Recognized known person: {person_name}")
-            else:
-                person_name = "unknown"
-                print(f"[INFO] Unknown person detected in {crop_name}")
-
-            # ✅ Always mark attendance
-            mark_attendance(person_name)
-
-    print(f"[THREAD] Recognition complete for {photo_id}.")
-
-
-    is_docker = os.path.exists("/.dockerenv")
-    if is_docker:
-        FileManager.delete_files_from_list(files)
-        FileManager.delete_folder_and_all_contents(person_folder)
-        FileManager.delete_old_files(os.path.dirname(person_folder),5)
-
-
-
-
-# ---------------------------------------------------
-# FACE CROPPING + RECOGNITION
-# ---------------------------------------------------
-def run_face_recognition(photo_id):
-    """Process saved frames -> detect faces -> save cropped -> encode + attendance."""
+    `folder` and `device_id` default to this process's OT folder and CAMERA_ID.
+    """
+    folder = folder or OT
     print(f"[THREAD] Starting recognition for Person {photo_id}...")
     
     if photo_id is None:
@@ -227,25 +281,29 @@ def run_face_recognition(photo_id):
     # Otherwise, return the original string
     
     
-    selected_files = get_person_files(photo_id)
-    #--------------------!IMP---------selected_files = select_top_images(files) #!IMPORTANT
-    #selected_files = get_best_images(files) #!IMPORTANT
-
-
-    if not selected_files:
+    files = get_person_files(photo_id, folder)
+    if not files:
         print(f"[THREAD] No files found for Person {photo_id}")
         return
 
+    # Only the sharpest BEST_FRAMES_K captures of each person are encoded
+    # (sharpness from the capture manifest; the rest are just deleted)
+    by_person = {}
+    for f in files:
+        by_person.setdefault(f["person_num"], []).append(f)
+    selected_files = [f for person_files in by_person.values()
+                      for f in get_best_images(person_files, _best_frames_k)]
+
     # Create subfolder for cropped faces
-    person_folder = os.path.join(OT, str(photo_id))
+    person_folder = os.path.join(folder, str(photo_id))
     os.makedirs(person_folder, exist_ok=True)
 
-    if 'known_faces_encodings' not in globals() or not known_faces_encodings:
-        load_known_faces()
-    for f in selected_files:
-        image = face_recognition.load_image_file(f["path"])
-        face_locations = face_recognition.face_locations(image)
-        encodings = face_recognition.face_encodings(image, face_locations)
+    refresh_known_faces()
+    person_faces = {}   # person number within the event -> (earliest datetime, encodings)
+    images = [load_capture(f["path"]) for f in selected_files]
+    # Face detection + encoding run in the encoder's process pool
+    results = get_face_encoder().encode_many(images, [f["box"] for f in selected_files])
+    for f, image, (face_locations, encodings) in zip(selected_files, images, results):
         primary_name = os.path.splitext(os.path.basename(f["path"]))[0]
         imgname = os.path.join(person_folder, f"{primary_name}.jpg")
         cv2.imwrite(imgname, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
@@ -259,24 +317,18 @@ def run_face_recognition(photo_id):
             crop_name = os.path.join(person_folder, f"{primary_name}_face_{i+1}.jpg")
             cv2.imwrite(crop_name, cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR))
             print(f"[INFO] Cropped face saved: {crop_name}")
-            # Compare current encoding with known faces
-            matches = face_recognition.compare_faces(known_faces_encodings, enc, tolerance=_tolerance)
-            face_distances = face_recognition.face_distance(known_faces_encodings, enc)
-            best_match_index = np.argmin(face_distances) if len(face_distances) > 0 else None
-
-            if True in matches and best_match_index is not None:
-                person_name = known_faces_names[best_match_index]
-                print(f"[INFO] Recognized known person: {person_name}")
-            else:
-                person_name = "unknown"
-                print(f"[INFO] Unknown person detected in {crop_name}")
+            ts, encs = person_faces.setdefault(f["person_num"], (f["datetime"], []))
+            person_faces[f["person_num"]] = (min(ts, f["datetime"]), encs)
+            encs.append(enc)
 
-            # ✅ Always mark attendance
-            mark_attendance(person_name,f["datetime"])
+    # One attendance decision per person of the event
+    for person_num, (ts, encs) in sorted(person_faces.items()):
+        record_identity(f"{photo_id}_{person_num}", encs, ts, device_id)
 
     print(f"[THREAD] Recognition complete for {photo_id}.")
 
-    FileManager.delete_files_from_list(selected_files)
+    FileManager.delete_files_from_list(files)
+    get_frame_index().discard(folder, photo_id)
     is_docker = os.path.exists("/.dockerenv")
     if is_docker:
         FileManager.delete_folder_and_all_contents(person_folder)
@@ -285,6 +337,67 @@ def run_face_recognition(photo_id):
 
 
 
+def match_face(enc, source=""):
+    """Return the guest_id of the closest known face within tolerance, else "unknown"."""
+    return match_faces([enc], [source])[0]
+
+
+def match_faces(encodings, sources=None):
+    """Batched match_face: one distance pass over the known-face index for all encodings."""
+    if len(encodings) == 0:
+        return []
+    sources = sources or [""] * len(encodings)
+    names = []
+    for (person_name, distance), source in zip(known_faces_index.match(encodings, _tolerance), sources):
+        if person_name != "unknown":
+            print(f"[INFO] Recognized known person: {person_name} (distance {distance:.3f})")
+        else:
+            print(f"[INFO] Unknown person detected in {source}")
+        names.append(person_name)
+    return names
+
+
+def record_identity(photo_id, encodings, ts, device_id=None):
+    """Fuse all face encodings of one person into a single attendance row."""
+    if not encodings:
+        print(f"[INFO] No faces found for {photo_id}")
+        return None
+    guest_id, confidence, distance, votes, faces = fuse_identity(known_faces_index, encodings, _tolerance)
+    if guest_id != "unknown" and confidence < _min_confidence:
+        print(f"[INFO] {photo_id}: {guest_id} below confidence ({confidence:.2f}), recording unknown")
+        guest_id = "unknown"
+    if guest_id != "unknown":
+        print(f"[INFO] Recognized known person: {guest_id} for {photo_id} "
+              f"({votes}/{faces} faces, distance {distance:.3f}, confidence {confidence:.2f})")
+    else:
+        print(f"[INFO] Unknown person for {photo_id} ({faces} faces)")
+    mark_attendance(guest_id, ts, device_id, confidence=round(confidence, 3))
+    return guest_id, confidence
+
+
+def run_face_recognition_frames(photo_id, captures, device_id=None):
+    """In-memory variant of run_face_recognition.
+
+    `captures` are the person crops handed over by the camera pipeline, each a
+    dict with "image" (BGR array), "datetime" and capture metadata; nothing is
+    read from or written to disk.
+    """
+    print(f"[THREAD] Starting recognition for Person {photo_id} ({len(captures)} frames)...")
+    if not captures:
+        print(f"[THREAD] No frames for Person {photo_id}")
+        return
+
+    refresh_known_faces()
+    images = [cv2.cvtColor(capture["image"], cv2.COLOR_BGR2RGB) for capture in captures]
+    results = get_face_encoder().encode_many(images, [capture.get("face_box") for capture in captures])
+    encodings = [enc for _, encs in results for enc in encs]
+    record_identity(photo_id, encodings, min(capture["datetime"] for capture in captures), device_id)
+
+    print(f"[THREAD] Recognition complete for {photo_id}.")
+
+
+
+
 def get_unprocessed_file_id(folder_path: str) -> Optional[str]:
     """
     Scans the given folder for .jpg files and extracts the first photo_id found.
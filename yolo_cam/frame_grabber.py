@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+
+from frame_sources import open_source
+
+
+# ------------------- Threaded Frame Grabber -------------------
+class FrameGrabber:
+    """
+    Drain a video stream on its own thread into a small ring buffer.
+
+    Every frame gets a sequence number and a capture timestamp. Readers get
+    buffered frames in order; a reader more than `buffer_size` frames behind
+    skips the ones that fell out of the ring instead of falling behind the
+    OpenCV/FFmpeg internal buffer. With buffer_size=1 (the default) that is
+    always the newest frame; a larger buffer absorbs short reader stalls.
+
+    `url` is an RTSP URL, or a video file / image folder to replay (see
+    frame_sources.open_source), or a ready source object. A lossless source
+    (fast replay) waits for the reader instead of skipping frames, and a
+    source that runs out sets `finished`.
+    """
+
+    def __init__(self, url, width=None, height=None, buffer_size=1,
+                 reconnect_after=50, reconnect_delay=2.0, name="grabber"):
+        self.source = open_source(url, width, height, name) if isinstance(url, str) else url
+        self.reconnect_after = reconnect_after
+        self.reconnect_delay = reconnect_delay
+        self.name = name
+
+        self.buffer = deque(maxlen=max(1, buffer_size))
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.finished = False
+        self.thread = None
+
+        self.frame_id = 0          # sequence number of the newest captured frame
+        self.last_read_id = 0      # sequence number last handed to a reader
+        self.frames_captured = 0
+        self.frames_dropped = 0    # captured but never handed to a reader
+        self.read_failures = 0
+
+    # --------------------------------------------------------
+    def start(self):
+        self.thread = threading.Thread(target=self._capture, daemon=True)
+        self.thread.start()
+        return self
+
+    def _capture(self):
+        try:
+            self._capture_loop()
+        finally:
+            self.source.release()
+
+    def _capture_loop(self):
+        # Opening an RTSP stream can take seconds; do it off the caller's thread.
+        self.source.open()
+        failures = 0
+        while not self.stopped:
+            if self.source.lossless:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.stopped or
+                                       self.frame_id - self.last_read_id < self.buffer.maxlen)
+            ret, frame = self.source.read()
+            if self.source.finished:
+                with self.cond:
+                    self.finished = True
+                    self.cond.notify_all()
+                break
+            if not ret or frame is None or frame.size == 0:
+                failures += 1
+                self.read_failures += 1
+                if failures >= self.reconnect_after:
+                    print(f"[WARN] {self.name}: {failures} failed reads, reconnecting")
+                    time.sleep(self.reconnect_delay)
+                    self.source.open()
+                    failures = 0
+                else:
+                    time.sleep(0.01)
+                continue
+
+            failures = 0
+            capture_ts = time.time()
+            with self.cond:
+                self.frame_id += 1
+                self.frames_captured += 1
+                self.buffer.append((self.frame_id, capture_ts, frame))
+                self.cond.notify_all()
+
+    # --------------------------------------------------------
+    def read(self, timeout=1.0):
+        """
+        Return the oldest buffered frame not yet handed out as (frame_id, capture_ts, frame).
+
+        Blocks up to `timeout` seconds for a new frame and returns
+        (None, None, None) if none arrives.
+        """
+        with self.cond:
+            if not self.cond.wait_for(
+                    lambda: self.stopped or self.finished or self.frame_id > self.last_read_id, timeout):
+                return None, None, None
+            if not self.buffer or self.frame_id <= self.last_read_id:
+                return None, None, None
+            frame_id, capture_ts, frame = next(item for item in self.buffer if item[0] > self.last_read_id)
+            self.frames_dropped += max(0, frame_id - self.last_read_id - 1)
+            self.last_read_id = frame_id
+            # A lossless source is waiting for this read
+            self.cond.notify_all()
+            return frame_id, capture_ts, frame
+
+    def nearest(self, ts, max_skew=None):
+        """
+        Return the buffered frame captured closest to `ts` as (frame_id, capture_ts, frame).
+
+        Used to pair a frame from another stream with this one. Returns
+        (None, None, None) if the buffer is empty or the closest frame is more
+        than `max_skew` seconds away.
+        """
+        with self.cond:
+            best = min(self.buffer, key=lambda item: abs(item[1] - ts), default=None)
+        if best is None or (max_skew is not None and abs(best[1] - ts) > max_skew):
+            return None, None, None
+        return best
+
+    def resize(self, buffer_size):
+        """Grow or shrink the ring buffer, keeping the newest frames."""
+        with self.cond:
+            if buffer_size != self.buffer.maxlen:
+                self.buffer = deque(self.buffer, maxlen=max(1, buffer_size))
+
+    def fps(self):
+        """Capture rate over the buffered frames (0.0 until two are buffered)."""
+        with self.cond:
+            if len(self.buffer) < 2:
+                return 0.0
+            span = self.buffer[-1][1] - self.buffer[0][1]
+            return (len(self.buffer) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        """Snapshot of capture counters for heartbeat logging."""
+        with self.cond:
+            return {
+                "captured": self.frames_captured,
+                "dropped": self.frames_dropped,
+                "read_failures": self.read_failures,
+                "last_frame_id": self.frame_id,
+            }
+
+    def stop(self):
+        self.stopped = True
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread is not None:
+            try:
+                # The capture thread releases the stream itself once it exits.
+                self.thread.join(timeout=2.0)
+            finally:
+                if self.thread.is_alive():
+                    # Stuck in a blocking read: release here so the stream is not leaked
+                    print(f"[WARN] {self.name}: capture thread did not stop, releasing the stream")
+                    self.source.release()
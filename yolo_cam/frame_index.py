@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from capture_manifest import get_capture_manifest
+
+CAPTURE_EXTENSIONS = (".jpg", ".webp", ".npy")
+
+
+def parse_capture_name(folder, filename, mtime):
+    """
+    File record for a saved capture named
+    <event>_<person>_<frame>_<humans>[_<x1>-<y1>-<x2>-<y2>].<jpg|webp|npy>, or None.
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() not in CAPTURE_EXTENSIONS:
+        return None
+    parts = stem.split("_")
+    if len(parts) < 3:
+        return None
+    try:
+        person_num = int(parts[1])
+        frame_no = int(parts[2])
+        # Optional trailing x1-y1-x2-y2 person box (ROI pixels)
+        box = tuple(int(v) for v in parts[-1].split("-")) if len(parts) > 3 and "-" in parts[-1] else None
+    except ValueError:
+        return None
+    return {
+        "path": os.path.join(folder, filename),
+        "person_num": person_num,
+        "frame_no": frame_no,
+        "box": box,
+        "datetime": datetime.fromtimestamp(mtime),
+    }
+
+
+def manifest_record(folder, entry):
+    """File record for a capture manifest entry (same keys as parse_capture_name)."""
+    box = entry.get("bbox")
+    return {
+        "path": os.path.join(folder, entry["file"]),
+        "person_num": int(entry["photo_id"].split("_")[1]),
+        "frame_no": entry["frame_no"],
+        "box": tuple(box) if box else None,
+        "datetime": datetime.fromtimestamp(entry["capture_ts"]),
+        "track_id": entry.get("track_id"),
+        "sharpness": entry.get("sharpness"),
+    }
+
+
+# ------------------- Frame Index -------------------
+class FrameIndex:
+    """
+    In-memory index of captures waiting in the disk hand-off folders.
+
+    save_frame() registers every capture it writes, which also appends it to the
+    folder's capture manifest, and a folder is loaded once (seed) when its
+    pipeline starts, so finding an event's files no longer lists the
+    directory and stats every entry. Captures are grouped by event id (the
+    part of the name before the first underscore) in arrival order.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.folders = {}   # folder -> OrderedDict(event_id -> [file records])
+
+    def _key(self, folder):
+        return os.path.abspath(folder)
+
+    def seed(self, folder):
+        """
+        Index every capture already in `folder`; returns the event ids found.
+
+        Capture times and boxes come from the manifest; one scandir (names
+        only) drops entries whose file is gone, and only files saved without
+        a manifest entry are stat'ed. The manifest is then compacted.
+        """
+        events = OrderedDict()
+        if os.path.isdir(folder):
+            names = {entry.name: entry for entry in os.scandir(folder) if entry.is_file()}
+            manifest = get_capture_manifest(folder)
+            live = set()
+            for event_id, entries in manifest.read().items():
+                for entry in entries:
+                    if names.pop(entry["file"], None) is not None:
+                        live.add(entry["file"])
+                        events.setdefault(event_id, []).append(manifest_record(folder, entry))
+            manifest.compact(lambda entry: entry["file"] in live)
+            for name in sorted(names):
+                record = parse_capture_name(folder, name, names[name].stat().st_mtime)
+                if record is not None:
+                    events.setdefault(name.split("_")[0], []).append(record)
+        with self.lock:
+            self.folders[self._key(folder)] = events
+        return list(events)
+
+    def tracked(self, folder):
+        with self.lock:
+            return self._key(folder) in self.folders
+
+    def add(self, path, capture_ts, track_id=None, sharpness=None):
+        """Register a capture just written to `path` and append it to the folder's manifest."""
+        folder, filename = os.path.split(path)
+        record = parse_capture_name(folder, filename, capture_ts)
+        parts = os.path.splitext(filename)[0].split("_")
+        if record is None or len(parts) < 4:
+            return
+        event_id, person, frame_no, humans = parts[:4]
+        entry = get_capture_manifest(folder).append(
+            event_id, f"{event_id}_{person}", int(frame_no), capture_ts, filename, int(humans),
+            record["box"], track_id, sharpness)
+        record = manifest_record(folder, entry)
+        with self.lock:
+            events = self.folders.setdefault(self._key(folder), OrderedDict())
+            events.setdefault(event_id, []).append(record)
+
+    def files(self, folder, event_id):
+        """Captures of `event_id` in `folder` (None if the folder is not indexed)."""
+        with self.lock:
+            events = self.folders.get(self._key(folder))
+            if events is None:
+                return None
+            return list(events.get(event_id, []))
+
+    def discard(self, folder, event_id):
+        """Forget an event once its captures have been processed and deleted."""
+        with self.lock:
+            events = self.folders.get(self._key(folder))
+            if events is None or events.pop(event_id, None) is None:
+                return
+        get_capture_manifest(folder).remove(event_id)
+
+    def drop_paths(self, folder, paths):
+        """Forget captures deleted by retention; events left with no captures are discarded."""
+        key = self._key(folder)
+        names = {os.path.basename(p) for p in paths if self._key(os.path.dirname(p)) == key}
+        emptied = []
+        with self.lock:
+            events = self.folders.get(key)
+            if events is None or not names:
+                return
+            for event_id in list(events):
+                kept = [r for r in events[event_id] if os.path.basename(r["path"]) not in names]
+                if kept:
+                    events[event_id] = kept
+                else:
+                    del events[event_id]
+                    emptied.append(event_id)
+        manifest = get_capture_manifest(folder)
+        for event_id in emptied:
+            manifest.remove(event_id)
+
+    def pending(self, folder):
+        """Event ids with captures still waiting in `folder`, oldest first."""
+        with self.lock:
+            return list(self.folders.get(self._key(folder), ()))
+
+
+_frame_index = FrameIndex()
+
+
+def get_frame_index():
+    return _frame_index
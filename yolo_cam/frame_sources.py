@@ -0,0 +1,133 @@
+import os
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+# ------------------- Frame Sources -------------------
+class VideoSource:
+    """Live stream (RTSP URL or device) read through cv2.VideoCapture."""
+
+    lossless = False   # a live camera never waits for its reader
+
+    def __init__(self, url, width=None, height=None, name="source"):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.name = name
+        self.cap = None
+        self.finished = False
+
+    def open(self):
+        self.release()
+        self.cap = cv2.VideoCapture(self.url)
+        # Keep the backend queue as short as possible; the grabber buffers itself.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if self.width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        print(f"[INFO] {self.name} opened stream:",
+              int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), "x",
+              int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ReplaySource:
+    """
+    Recorded video (.mp4, .webm, ...) or folder of images played back like a camera.
+
+    `rate` is "native" (the file's FPS, `fps` for image folders), "fast" (as
+    fast as the reader takes frames; no frame is skipped) or a number of
+    frames per second. At the end the source is `finished`, or starts over
+    when `loop` is set.
+    """
+
+    def __init__(self, path, rate="native", loop=False, fps=25.0, name="replay"):
+        self.path = path
+        self.rate = str(rate).lower()
+        self.loop = loop
+        self.default_fps = fps
+        self.name = name
+        self.lossless = self.rate == "fast"
+        self.cap = None
+        self.images = None
+        self.position = 0
+        self.interval = 0.0
+        self.next_ts = None
+        self.finished = False
+
+    def open(self):
+        self.release()
+        if os.path.isdir(self.path):
+            self.images = sorted(os.path.join(self.path, name) for name in os.listdir(self.path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS))
+            native_fps = self.default_fps
+            count = len(self.images)
+        else:
+            self.cap = cv2.VideoCapture(self.path)
+            native_fps = self.cap.get(cv2.CAP_PROP_FPS) or self.default_fps
+            count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.position = 0
+        if self.rate == "fast":
+            self.interval = 0.0
+        elif self.rate == "native":
+            self.interval = 1.0 / native_fps
+        else:
+            self.interval = 1.0 / float(self.rate)
+        self.next_ts = None
+        pace = f"{1.0 / self.interval:.1f} fps" if self.interval else "as fast as read"
+        print(f"[INFO] {self.name} replaying {self.path}: {count} frames, {pace}")
+
+    def _decode(self):
+        if self.images is not None:
+            while self.position < len(self.images):
+                frame = cv2.imread(self.images[self.position])
+                if frame is not None:
+                    return True, frame
+                self.position += 1   # unreadable image: skip it
+            return False, None
+        return self.cap.read()
+
+    def read(self):
+        if self.interval:
+            # Pace frames like the camera would, without drifting
+            now = time.time()
+            self.next_ts = now if self.next_ts is None else self.next_ts + self.interval
+            if self.next_ts > now:
+                time.sleep(self.next_ts - now)
+        ret, frame = self._decode()
+        self.position += 1
+        if not ret and self.loop and self.position > 1:
+            self.open()
+            ret, frame = self._decode()
+            self.position += 1
+        if not ret:
+            self.finished = True
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+def open_source(url, width=None, height=None, name="source"):
+    """
+    Frame source for `url`: a local video file or image folder is replayed
+    (REPLAY_RATE native | fast | <fps>, REPLAY_LOOP), anything else is a stream.
+    """
+    if os.path.exists(url):
+        return ReplaySource(url, os.getenv("REPLAY_RATE", "native"),
+                            str(os.getenv("REPLAY_LOOP", "false")).lower() in ("1", "true", "yes"),
+                            float(os.getenv("REPLAY_FPS", 25)), name=name)
+    return VideoSource(url, width, height, name=name)
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+# ------------------- Identity Fusion -------------------
+def fuse_identity(index, encodings, tolerance, k=3):
+    """
+    One identity decision for all face encodings of one person (track/photo_id).
+
+    Every face votes for its nearest known guest within `tolerance`; the
+    guest with the most votes wins, ties going to the lower mean distance.
+    index.query() may be approximate (prototype / IVF indexes), so the
+    winner is then verified against all of its enrolled encodings: a face
+    counts for it only if its exact distance is within `tolerance` and no
+    farther than the nearest guest the query returned, and mean_distance
+    is taken over those faces. Faces that match nobody count against the
+    winner, so
+
+        confidence = votes / faces * (1 - mean_distance / tolerance)
+
+    lies in [0, 1]. Returns (guest_id or "unknown", confidence, mean_distance, votes, faces).
+    """
+    faces = len(encodings)
+    if faces == 0 or len(index) == 0:
+        return "unknown", 0.0, None, 0, faces
+
+    queries = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    ids, dists = index.query(queries, k=k)
+    votes = {}
+    distances = {}
+    for face_ids, face_dists in zip(ids, dists):
+        seen = set()
+        for rank, (gid, d) in enumerate(zip(face_ids, face_dists)):
+            if d > tolerance or gid in seen:
+                continue
+            seen.add(gid)
+            # Mean distance uses each face's closest encoding of the guest
+            distances.setdefault(gid, []).append(float(d))
+            if rank == 0:
+                votes[gid] = votes.get(gid, 0) + 1
+
+    if not votes:
+        return "unknown", 0.0, None, 0, faces
+
+    def rank(gid):
+        return votes[gid], -np.mean(distances[gid])
+
+    best = max(votes, key=rank)
+
+    # Exact verification of the winner
+    exact = index.guest_distances(queries, best)
+    nearest = dists[:, 0] if dists.shape[1] else np.full(faces, np.inf)
+    # Slack for the float32 rounding of the query's expanded distances
+    voters = (exact <= tolerance) & (exact <= nearest + 1e-3)
+    best_votes = int(np.count_nonzero(voters))
+    if best_votes == 0:
+        return "unknown", 0.0, None, 0, faces
+    # Over the faces that voted for the winner only, so it matches the vote count
+    mean_distance = float(np.mean(exact[voters]))
+    confidence = best_votes / faces * max(0.0, 1.0 - mean_distance / tolerance)
+    return best, float(confidence), mean_distance, best_votes, faces
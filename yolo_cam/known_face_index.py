@@ -0,0 +1,181 @@
+import numpy as np
+
+
+# ------------------- Known Face Index -------------------
+class KnownFaceIndex:
+    """
+    Enrolled face encodings as one contiguous float32 (N,128) matrix.
+
+    Squared norms are precomputed, so a batch of M query faces is matched
+    against every enrolled encoding with a single (M,128) x (128,N) product:
+    ||q - k||^2 = ||q||^2 + ||k||^2 - 2 q.k. Distances are the same Euclidean
+    distances face_recognition.face_distance returns.
+
+    An index is never modified in place: with_changes() returns a new one, so
+    a reader holding the old index keeps a consistent view.
+    """
+
+    def __init__(self, encodings=None, guest_ids=None, face_ids=None):
+        if encodings is None or len(encodings) == 0:
+            self.matrix = np.zeros((0, 128), dtype=np.float32)
+        else:
+            self.matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+        self.guest_ids = np.asarray(guest_ids if guest_ids is not None else [], dtype=object)
+        if len(self.guest_ids) != len(self.matrix):
+            raise ValueError(f"{len(self.matrix)} encodings but {len(self.guest_ids)} guest ids")
+        self.face_ids = np.asarray(face_ids if face_ids is not None else np.full(len(self.matrix), -1),
+                                   dtype=np.int64)
+        if len(self.face_ids) != len(self.matrix):
+            raise ValueError(f"{len(self.matrix)} encodings but {len(self.face_ids)} face ids")
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def with_changes(self, remove_face_ids=(), remove_guest_ids=(), add=None):
+        """
+        New index without the given face_ids / guests' faces, plus `add`, a
+        (face_ids, guest_ids, encodings) tuple of rows to append.
+        """
+        keep = ~np.isin(self.face_ids, np.asarray(list(remove_face_ids), dtype=np.int64))
+        if len(remove_guest_ids):
+            keep &= ~np.isin(self.guest_ids, np.asarray(list(remove_guest_ids), dtype=object))
+        face_ids, guest_ids, matrix = self.face_ids[keep], self.guest_ids[keep], self.matrix[keep]
+        if add is not None and len(add[0]):
+            face_ids = np.concatenate([face_ids, np.asarray(add[0], dtype=np.int64)])
+            guest_ids = np.concatenate([guest_ids, np.asarray(add[1], dtype=object)])
+            matrix = np.vstack([matrix, np.asarray(add[2], dtype=np.float32).reshape(-1, 128)])
+        return KnownFaceIndex(matrix, guest_ids, face_ids)
+
+    def distances(self, queries):
+        """(M,N) Euclidean distances between M query encodings and every enrolled one."""
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        d2 = np.einsum("ij,ij->i", q, q)[:, None] + self.sq_norms[None, :] - 2.0 * (q @ self.matrix.T)
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def query(self, queries, k=1):
+        """
+        Top-k nearest enrolled encodings for each of M queries.
+
+        Returns (guest_ids, distances), both (M, k') with k' = min(k, N),
+        sorted nearest first.
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        k = min(k, len(self))
+        if k == 0 or len(q) == 0:
+            return np.empty((len(q), 0), dtype=object), np.empty((len(q), 0), dtype=np.float32)
+
+        dist = self.distances(q)
+        if k < dist.shape[1]:
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.tile(np.arange(dist.shape[1]), (len(q), 1))
+        top = np.take_along_axis(dist, idx, axis=1)
+        order = np.argsort(top, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        return self.guest_ids[idx], np.take_along_axis(top, order, axis=1)
+
+    def guest_distances(self, queries, guest_id):
+        """Exact distance from each of M queries to the nearest enrolled encoding of `guest_id` (inf if none)."""
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        rows = np.flatnonzero(self.guest_ids == guest_id)
+        if len(rows) == 0:
+            return np.full(len(q), np.inf, dtype=np.float32)
+        # Direct differences: no float32 cancellation from the ||q||^2 + ||k||^2 - 2 q.k expansion
+        return np.linalg.norm(q[:, None, :] - self.matrix[rows][None, :, :], axis=2).min(axis=1)
+
+    def match(self, queries, tolerance):
+        """Best guest_id per query, or "unknown" when the nearest face is farther than `tolerance`."""
+        ids, dists = self.query(queries, k=1)
+        if ids.shape[1] == 0:
+            return [("unknown", None) for _ in range(len(ids))]
+        return [(gid if d <= tolerance else "unknown", float(d)) for gid, d in zip(ids[:, 0], dists[:, 0])]
+
+
+# ------------------- Prototype Index -------------------
+class PrototypeFaceIndex(KnownFaceIndex):
+    """
+    KnownFaceIndex with a per-guest prototype layer.
+
+    Each guest gets a centroid of their encodings (rescaled to the members'
+    mean norm) and a radius, the largest member-to-centroid distance. By the
+    triangle inequality no encoding of a guest is closer than
+    d(query, centroid) - radius, so match() only verifies the raw encodings
+    of guests whose bound is within tolerance; the result is the same as an
+    exact scan. Prototypes are rebuilt with every with_changes().
+    """
+
+    def __init__(self, encodings=None, guest_ids=None, face_ids=None, shortlist=8):
+        super().__init__(encodings, guest_ids, face_ids)
+        self.shortlist = shortlist
+        self.distance_count = 0      # encodings + prototypes compared, for benchmarks
+        self.guests, inverse = np.unique(self.guest_ids.astype(str), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(self.guests)).astype(np.float32)
+
+        sums = np.zeros((len(self.guests), 128), dtype=np.float32)
+        np.add.at(sums, inverse, self.matrix)
+        norm_sums = np.zeros(len(self.guests), dtype=np.float32)
+        np.add.at(norm_sums, inverse, np.sqrt(self.sq_norms))
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        scale = (norm_sums / np.maximum(counts, 1)) / np.maximum(np.linalg.norm(centroids, axis=1), 1e-6)
+        self.centroids = np.ascontiguousarray(centroids * scale[:, None], dtype=np.float32)
+        self.centroid_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+        self.radius = np.zeros(len(self.guests), dtype=np.float32)
+        if len(self):
+            np.maximum.at(self.radius, inverse, np.linalg.norm(self.matrix - self.centroids[inverse], axis=1))
+        # Rows grouped by guest: rows of guest g are order[offsets[g]:offsets[g+1]]
+        self.order = np.argsort(inverse, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(counts.astype(np.int64))])
+
+    def with_changes(self, remove_face_ids=(), remove_guest_ids=(), add=None):
+        index = super().with_changes(remove_face_ids, remove_guest_ids, add)
+        return PrototypeFaceIndex(index.matrix, index.guest_ids, index.face_ids, self.shortlist)
+
+    def _prototype_bounds(self, q):
+        d2 = np.einsum("ij,ij->i", q, q)[:, None] + self.centroid_sq[None, :] - 2.0 * (q @ self.centroids.T)
+        self.distance_count += q.shape[0] * len(self.guests)
+        return np.sqrt(np.maximum(d2, 0.0)) - self.radius[None, :]
+
+    def _verify(self, q, guests):
+        """Distances from one query to the raw encodings of `guests` -> (rows, distances)."""
+        if len(guests) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([self.order[self.offsets[g]:self.offsets[g + 1]] for g in guests])
+        d2 = float(q @ q) + self.sq_norms[rows] - 2.0 * (self.matrix[rows] @ q)
+        self.distance_count += len(rows)
+        return rows, np.sqrt(np.maximum(d2, 0.0))
+
+    def match(self, queries, tolerance):
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        if len(self) == 0:
+            return [("unknown", None) for _ in range(len(q))]
+        bounds = self._prototype_bounds(q)
+        results = []
+        for i in range(len(q)):
+            rows, d = self._verify(q[i], np.flatnonzero(bounds[i] <= tolerance))
+            if len(rows) == 0:
+                results.append(("unknown", None))
+                continue
+            best = int(np.argmin(d))
+            gid = self.guest_ids[rows[best]]
+            results.append((gid if d[best] <= tolerance else "unknown", float(d[best])))
+        return results
+
+    def query(self, queries, k=1):
+        """Top-k among the `shortlist` guests with the lowest prototype bound (approximate)."""
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, 128)
+        k = min(k, len(self))
+        ids = np.full((len(q), k), "unknown", dtype=object)
+        dists = np.full((len(q), k), np.inf, dtype=np.float32)
+        if k == 0 or len(q) == 0:
+            return ids, dists
+        bounds = self._prototype_bounds(q)
+        for i in range(len(q)):
+            guests = np.argsort(bounds[i])[:max(self.shortlist, k)]
+            rows, d = self._verify(q[i], guests)
+            top = np.argsort(d)[:k]
+            ids[i, :len(top)] = self.guest_ids[rows[top]]
+            dists[i, :len(top)] = d[top]
+        return ids, dists
@@ -2,7 +2,6 @@ import os, json, cv2, random, threading, time
 from datetime import datetime, timedelta
 from utilities.environment_variables import load_environment
 from pathlib import Path
-import face_recognition
 from master_faces_db import process_all_json_files
 
 
@@ -69,6 +68,9 @@ def process_single_video(video_path: str, guest_data: dict, json_filename: str):
     Extract up to 3 face encodings from random frames in a video
     and save both cropped face images and encodings in the guest JSON file.
     """
+    # Imported here: dlib is only loaded when a guest video is actually processed
+    import face_recognition
+
     try:
         # Ensure output directory exists
         os.makedirs(VIDEOS_PATH, exist_ok=True)
@@ -6,7 +6,7 @@ from pathlib import Path
 from utilities.environment_variables import load_environment
 import logging
 from json import JSONDecodeError
-import face_recognition_worker
+from face_encoding_store import ensure_encoding_blob_column, ensure_face_change_log, insert_encoding
 
 # Set up a simple logger (if not already configured in your app)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -32,6 +32,8 @@ JSON_DIR =VIDEOS_PATH
 def get_db_connection():
 
     conn = sqlite3.connect(DB_PATH)
+    ensure_encoding_blob_column(conn)
+    ensure_face_change_log(conn)
     cursor = conn.cursor()
     return conn, cursor
 
@@ -64,11 +66,7 @@ def insert_guest(cursor, guest_id, name, guest_type, comments,email,phone_number
 # -----------------------
 def insert_face_encodings(cursor, guest_id, encodings):
     for enc in encodings:
-        enc_json = json.dumps(enc)
-        cursor.execute("""
-            INSERT INTO guest_faces (guest_id, encoding)
-            VALUES (?, ?)
-        """, (guest_id, enc_json))
+        insert_encoding(cursor, guest_id, enc)
 
 
 def load_json_file(json_file_path):
@@ -143,7 +141,7 @@ def process_json_file(cursor, json_file_path):
         )
 
         insert_face_encodings(cursor, guest_id, valid_encodings)
-        face_recognition_worker.load_known_faces()
+        # Recognizers pick the new faces up from face_index_changes (see refresh_known_faces)
         
     except Exception as e:
         logging.exception(f"❌ Database insert failed for {json_file_path}: {e}")
@@ -274,11 +272,7 @@ def sync_json_to_db():
             # --- Insert encodings ---
             added = 0
             for enc in enc_list:
-                enc_json = json.dumps(enc)
-                cur.execute(
-                    "INSERT INTO guest_faces (guest_id, encoding) VALUES (?, ?)",
-                    (guest_id, enc_json)
-                )
+                insert_encoding(cur, guest_id, enc)
                 added += 1
 
             conn.commit()
@@ -0,0 +1,74 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+# ------------------- Motion Gate -------------------
+class MotionGate:
+    """
+    Cheap motion check in front of the person detector.
+
+    Keeps a running-average background of a small grayscale copy of the ROI
+    and reports motion when enough pixels differ from it. A keep-alive lets a
+    frame through every `keepalive_seconds` so a person standing still is
+    still picked up eventually.
+    """
+
+    def __init__(self, threshold=0.005, pixel_delta=25, width=160,
+                 keepalive_seconds=5.0, learning_rate=0.05):
+        self.threshold = threshold            # fraction of changed pixels
+        self.pixel_delta = pixel_delta        # grey-level change that counts
+        self.width = width
+        self.keepalive_seconds = keepalive_seconds
+        self.learning_rate = learning_rate
+
+        self.background = None
+        self.last_pass_ts = 0.0
+        self.last_motion = 0.0
+        self.frames_passed = 0
+        self.frames_gated = 0
+
+    def _prepare(self, roi):
+        h, w = roi.shape[:2]
+        height = max(1, int(h * self.width / max(1, w)))
+        small = cv2.resize(roi, (self.width, height), interpolation=cv2.INTER_NEAREST)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0).astype(np.float32)
+
+    def check(self, roi):
+        """Update the background with this ROI and return True if YOLO should run."""
+        gray = self._prepare(roi)
+        now = time.time()
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray
+            self.last_pass_ts = now
+            self.frames_passed += 1
+            return True
+
+        diff = cv2.absdiff(gray, self.background)
+        self.last_motion = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if self.last_motion >= self.threshold or now - self.last_pass_ts >= self.keepalive_seconds:
+            self.last_pass_ts = now
+            self.frames_passed += 1
+            return True
+
+        self.frames_gated += 1
+        return False
+
+
+def motion_gate_from_env():
+    """Build a MotionGate from MOTION_* settings, or None when MOTION_GATE is off."""
+    if os.getenv("MOTION_GATE", "false").lower() not in ("1", "true", "yes"):
+        return None
+    return MotionGate(
+        threshold=float(os.getenv("MOTION_THRESHOLD", 0.005)),
+        pixel_delta=int(os.getenv("MOTION_PIXEL_DELTA", 25)),
+        width=int(os.getenv("MOTION_WIDTH", 160)),
+        keepalive_seconds=float(os.getenv("MOTION_KEEPALIVE_SECONDS", 5)),
+    )
@@ -0,0 +1,71 @@
+import json
+import os
+import signal
+import time
+
+import cv2
+
+
+def load_camera_configs(path):
+    """
+    Read a JSON list of camera settings.
+
+    Each entry uses the same keys as the single-camera environment, e.g.
+    {"CAMERA_ID": "LIFT", "RTSP_IPADDRESS": "192.168.1.4:554", "FRAME_TOP": 5, ...}.
+    Keys left out fall back to the process environment.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must contain a non-empty list of camera configs")
+    from camera_pipeline import CameraConfig
+    return [CameraConfig(entry) for entry in entries]
+
+
+# ------------------- Main Logic -------------------
+if __name__ == "__main__":
+    # Project modules are imported here, not at the top: the face encoder's
+    # spawn workers re-import this script as __mp_main__ (see face_encoder).
+    from attendance_writer import close_attendance_writer
+    from capture_writer import close_capture_writer
+    from face_encoder import close_face_encoder
+    from recognition_queue import close_recognition_queue
+    from camera_pipeline import CameraPipeline
+    from master_faces import thread_video_process
+    from utilities.environment_variables import load_environment
+    from yolo_worker import YOLOWorker
+
+    load_environment("./../data/.env.yolocam")
+
+    CAMERAS_CONFIG = os.getenv("CAMERAS_CONFIG", "./../data/cameras.json")
+    configs = load_camera_configs(CAMERAS_CONFIG)
+    print(f"[INFO] Loaded {len(configs)} cameras from {CAMERAS_CONFIG}: "
+          f"{', '.join(cfg.camera_id for cfg in configs)}")
+
+    # One model for every camera; each batch holds the newest frame of each camera.
+    _YOLO_MODEL = os.getenv("YOLO_MODEL", "yolov8n.pt")
+    max_batch = int(os.getenv("YOLO_MAX_BATCH", len(configs)))
+    detector = YOLOWorker(_YOLO_MODEL, conf=0.5, max_batch=max_batch).start()
+
+    pipelines = [CameraPipeline(cfg, detector).start() for cfg in configs]
+    # docker stop sends SIGTERM: leave the loop so pending attendance gets flushed
+    signal.signal(signal.SIGTERM, lambda *_: setattr(pipelines[0], "stop_requested", True))
+
+    # --- Main Loop: round-robin over cameras without blocking on any one ---
+    while not any(p.stop_requested for p in pipelines):
+        thread_video_process()
+        busy = False
+        for pipeline in pipelines:
+            busy = pipeline.step(timeout=0) or busy
+        if not busy:
+            time.sleep(0.005)
+
+    # --- Cleanup ---
+    for pipeline in pipelines:
+        pipeline.stop()
+    detector.stop()
+    close_capture_writer()        # saved captures queue their recognition jobs when written
+    close_recognition_queue()     # persists submitted jobs, lets running ones finish
+    close_face_encoder()
+    close_attendance_writer()
+    cv2.destroyAllWindows()
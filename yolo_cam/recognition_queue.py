@@ -0,0 +1,382 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from frame_index import get_frame_index
+from face_recognition_worker import DB_PATH, run_face_recognition, run_face_recognition_frames
+
+
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+# ------------------- Persistent Recognition Queue -------------------
+class RecognitionQueue:
+    """
+    Durable hand-off of persons from the camera pipelines to recognition.
+
+    Every job is a row in the `recognition_jobs` table with a state
+    (queued / running / done / failed) and an attempt counter, so work that
+    was queued or running when the container stopped is picked up again on
+    the next start. In-memory captures are also kept as JPEG blobs in
+    `recognition_job_frames` until the job is done; disk hand-off jobs only
+    need the folder their frames were saved to.
+
+    Jobs belong to an `owner` (the CAMERA_ID of the container, or
+    RECOG_QUEUE_OWNER), so containers sharing the DB only resume their own.
+    submit() never touches the DB: an intake thread encodes and persists
+    each job (retrying while the DB is busy) before handing it to the fixed
+    pool of worker threads that serves the queue. Jobs are never dropped:
+    instead, saturated() tells the cameras to stop capturing new frames until
+    the backlog drains.
+    """
+
+    def __init__(self, workers=2, high_water=8, max_attempts=3, owner="LIFT", keep_days=7, db_path=DB_PATH):
+        self.workers = workers
+        self.high_water = high_water
+        self.max_attempts = max_attempts
+        self.owner = owner
+        self.keep_days = keep_days
+        self.db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        self.q = queue.Queue()
+        self.intake = queue.Queue()   # (photo_id, captures, device_id, folder) not persisted yet
+        self.stop_event = threading.Event()
+        self.intake_thread = None
+        self.unpersisted = {}   # (folder, photo_id) -> disk jobs submitted but not in the DB yet
+        self.captures = {}   # job_id -> captures still held in memory
+        self.running = 0
+        self.running_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.job_seconds = deque(maxlen=1000)   # durations of recent successful jobs
+        self.threads = []
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.db_lock:
+            self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS recognition_jobs (
+                job_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+                photo_id    VARCHAR(40) NOT NULL,
+                owner       VARCHAR(50),
+                device_id   VARCHAR(50),
+                folder      TEXT,
+                state       VARCHAR(10) DEFAULT 'queued' CHECK(state IN ('queued','running','done','failed')),
+                attempts    INTEGER DEFAULT 0,
+                last_error  TEXT,
+                created_on  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_on  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_recognition_jobs_state ON recognition_jobs(owner, state);
+            CREATE TABLE IF NOT EXISTS recognition_job_frames (
+                job_id       INTEGER NOT NULL,
+                frame_num    INTEGER,
+                person_count INTEGER,
+                capture_ts   REAL,
+                face_box     TEXT,
+                image        BLOB NOT NULL,
+                FOREIGN KEY (job_id) REFERENCES recognition_jobs(job_id) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_recognition_job_frames_job ON recognition_job_frames(job_id);
+            """)
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(recognition_job_frames)")]
+            if "face_box" not in columns:
+                self.db.execute("ALTER TABLE recognition_job_frames ADD COLUMN face_box TEXT")
+            self.db.commit()
+
+    def _execute(self, sql, params=()):
+        with self.db_lock:
+            cur = self.db.execute(sql, params)
+            self.db.commit()
+            return cur
+
+    def _set_state(self, job_id, state, error=None):
+        self._execute("UPDATE recognition_jobs SET state = ?, last_error = ?, updated_on = ? WHERE job_id = ?",
+                      (state, error, datetime.now().isoformat(), job_id))
+
+    # --------------------------------------------------------
+    def start(self):
+        """Re-queue this owner's jobs left over from a previous run, then start the workers."""
+        with self.db_lock:
+            self.db.execute("UPDATE recognition_jobs SET state = 'queued' WHERE owner = ? AND state = 'running'",
+                            (self.owner,))
+            self.db.execute("DELETE FROM recognition_jobs WHERE owner = ? AND state IN ('done','failed') "
+                            "AND datetime(updated_on) < datetime('now', 'localtime', ?)", (self.owner, f"-{self.keep_days} days"))
+            self.db.commit()
+            pending = [row[0] for row in self.db.execute(
+                "SELECT job_id FROM recognition_jobs WHERE owner = ? AND state = 'queued' ORDER BY job_id",
+                (self.owner,))]
+        if pending:
+            print(f"[INFO] Recognition queue: resuming {len(pending)} jobs from the last run")
+        for job_id in pending:
+            self.q.put(job_id)
+
+        self.intake_thread = threading.Thread(target=self._intake, name="recognizer-intake", daemon=True)
+        self.intake_thread.start()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"recognizer-{i+1}", daemon=True)
+            t.start()
+            self.threads.append(t)
+        return self
+
+    def _load_captures(self, job_id):
+        """Decode the persisted crops of a job resumed after a restart."""
+        with self.db_lock:
+            rows = self.db.execute(
+                "SELECT frame_num, person_count, capture_ts, face_box, image FROM recognition_job_frames "
+                "WHERE job_id = ? ORDER BY rowid", (job_id,)).fetchall()
+        captures = []
+        for frame_num, person_count, capture_ts, face_box, blob in rows:
+            image = cv2.imdecode(np.frombuffer(blob, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            captures.append({
+                "image": image,
+                "frame_num": frame_num,
+                "person_count": person_count,
+                "capture_ts": capture_ts,
+                "face_box": tuple(json.loads(face_box)) if face_box else None,
+                "datetime": datetime.fromtimestamp(capture_ts),
+            })
+        return captures
+
+    def _work(self):
+        while True:
+            job_id = self.q.get()
+            if job_id is None:
+                break
+            with self.db_lock:
+                row = self.db.execute(
+                    "SELECT photo_id, device_id, folder, attempts FROM recognition_jobs WHERE job_id = ?",
+                    (job_id,)).fetchone()
+            if row is None:
+                continue
+            photo_id, device_id, folder, attempts = row
+            try:
+                self._execute("UPDATE recognition_jobs SET state = 'running', attempts = attempts + 1, "
+                              "updated_on = ? WHERE job_id = ?", (datetime.now().isoformat(), job_id))
+            except sqlite3.Error as e:
+                print(f"[WARN] Recognition queue could not start job {job_id}, requeued: {e}")
+                time.sleep(1.0)
+                self.q.put(job_id)
+                continue
+            with self.running_lock:
+                self.running += 1
+            started = time.perf_counter()
+            try:
+                if folder is not None:
+                    run_face_recognition(photo_id, folder, device_id)
+                else:
+                    captures = self.captures.get(job_id)
+                    if captures is None:
+                        captures = self._load_captures(job_id)
+                    run_face_recognition_frames(photo_id, captures, device_id)
+                self._set_state(job_id, "done")
+                self._execute("DELETE FROM recognition_job_frames WHERE job_id = ?", (job_id,))
+                self.captures.pop(job_id, None)
+                self.completed += 1
+                self.job_seconds.append(time.perf_counter() - started)
+            except Exception as e:
+                if attempts + 1 < self.max_attempts:
+                    self._set_state(job_id, "queued", str(e))
+                    self.retried += 1
+                    print(f"[WARN] Recognition failed for {photo_id} (attempt {attempts + 1}), retrying: {e}")
+                    self.q.put(job_id)
+                else:
+                    self._set_state(job_id, "failed", str(e))
+                    self._execute("DELETE FROM recognition_job_frames WHERE job_id = ?", (job_id,))
+                    self.captures.pop(job_id, None)
+                    self.failed += 1
+                    print(f"[ERROR] Recognition failed for {photo_id} after {attempts + 1} attempts: {e}")
+            finally:
+                with self.running_lock:
+                    self.running -= 1
+
+    # --------------------------------------------------------
+    def submit(self, photo_id, captures=None, device_id=None, folder=None, reserved=False):
+        """
+        Queue a recognition job; returns at once (safe on the detection thread).
+
+        Pass `captures` (in-memory crops) or `folder` (disk hand-off, frames
+        saved as photo_id_*.jpg). The intake thread persists the job; a disk
+        job already queued or running for the same photo_id is not queued twice.
+        reserved=True: reserve() already counted this disk job as active.
+        """
+        self.submitted += 1
+        if folder is not None and not reserved:
+            self.reserve(photo_id, folder)
+        self.intake.put((photo_id, captures, device_id, folder))
+
+    def reserve(self, photo_id, folder):
+        """
+        Count a disk job as active before it is submitted (its captures are
+        still being written), so retention keeps its files; the matching
+        submit() passes reserved=True.
+        """
+        key = (os.path.abspath(folder), photo_id)
+        with self.running_lock:
+            self.unpersisted[key] = self.unpersisted.get(key, 0) + 1
+
+    def _done_persisting(self, photo_id, folder):
+        if folder is None:
+            return
+        key = (os.path.abspath(folder), photo_id)
+        with self.running_lock:
+            self.unpersisted[key] -= 1
+            if not self.unpersisted[key]:
+                del self.unpersisted[key]
+
+    def active_events(self, folder):
+        """
+        Event ids with a disk job in `folder` that is not finished yet
+        (waiting to be persisted, queued or running); retention keeps their files.
+        """
+        key = os.path.abspath(folder)
+        with self.running_lock:
+            events = {photo_id for job_folder, photo_id in self.unpersisted if job_folder == key}
+        with self.db_lock:
+            rows = self.db.execute(
+                "SELECT photo_id, folder FROM recognition_jobs "
+                "WHERE folder IS NOT NULL AND state IN ('queued','running')").fetchall()
+        events.update(photo_id for photo_id, job_folder in rows if os.path.abspath(job_folder) == key)
+        # run_face_recognition takes the event id from "<event>_<person>" photo ids
+        return {photo_id.split("_")[0] for photo_id in events}
+
+    def _intake(self):
+        while True:
+            item = self.intake.get()
+            if item is None:
+                break
+            delay = 0.5
+            while True:
+                try:
+                    self._persist(*item)
+                    break
+                except sqlite3.Error as e:
+                    # Webapp or attendance writer holding the DB: keep the job and retry
+                    print(f"[WARN] Recognition queue could not persist job for {item[0]}, "
+                          f"retrying in {delay:.1f}s: {e}")
+                    if self.stop_event.wait(delay):
+                        return
+                    delay = min(delay * 2, 30.0)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"[ERROR] Recognition job for {item[0]} could not be queued: {e}")
+                    break
+            self._done_persisting(item[0], item[3])
+
+    def _persist(self, photo_id, captures, device_id, folder):
+        """Write one job (and its JPEG-encoded captures) to the DB and queue it for the workers."""
+        frames = []
+        for capture in captures or []:
+            ok, jpg = cv2.imencode(".jpg", capture["image"])
+            if ok:
+                frames.append((capture["frame_num"], capture["person_count"], capture["capture_ts"],
+                               json.dumps([int(v) for v in capture["face_box"]]) if capture.get("face_box") else None,
+                               sqlite3.Binary(jpg.tobytes())))
+        now = datetime.now().isoformat()
+        with self.db_lock:
+            try:
+                if folder is not None:
+                    existing = self.db.execute(
+                        "SELECT job_id FROM recognition_jobs WHERE owner = ? AND photo_id = ? AND folder = ? "
+                        "AND state IN ('queued','running')", (self.owner, photo_id, folder)).fetchone()
+                    if existing is not None:
+                        return existing[0]
+                cur = self.db.execute(
+                    "INSERT INTO recognition_jobs (photo_id, owner, device_id, folder, created_on, updated_on) "
+                    "VALUES (?,?,?,?,?,?)", (photo_id, self.owner, device_id, folder, now, now))
+                job_id = cur.lastrowid
+                self.db.executemany(
+                    "INSERT INTO recognition_job_frames "
+                    "(job_id, frame_num, person_count, capture_ts, face_box, image) VALUES (?,?,?,?,?,?)",
+                    [(job_id,) + frame for frame in frames])
+                self.db.commit()
+            except sqlite3.Error:
+                self.db.rollback()
+                raise
+        if captures is not None:
+            self.captures[job_id] = captures
+        self.q.put(job_id)
+        return job_id
+
+    def recover_folder(self, folder, device_id=None):
+        """Index a disk hand-off folder and queue jobs for frames left there by a previous run."""
+        # One scan seeds the frame index; from here on save_frame keeps it current
+        photo_ids = [photo_id for photo_id in get_frame_index().seed(folder)
+                     if not os.path.exists(os.path.join(folder, photo_id))]
+        for photo_id in photo_ids:
+            self.submit(photo_id, device_id=device_id, folder=folder)
+        if photo_ids:
+            print(f"[INFO] Recognition queue: recovered {len(photo_ids)} unprocessed events in {folder}")
+        return len(photo_ids)
+
+    def depth(self):
+        """Jobs waiting (to be persisted or recognised) or being recognised right now."""
+        return self.intake.qsize() + self.q.qsize() + self.running
+
+    def saturated(self):
+        """True when cameras should hold off capturing new frames."""
+        return self.depth() >= self.high_water
+
+    def counts(self):
+        """Number of persisted jobs per state."""
+        with self.db_lock:
+            rows = self.db.execute("SELECT state, COUNT(*) FROM recognition_jobs WHERE owner = ? GROUP BY state",
+                                   (self.owner,)).fetchall()
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def stop(self, timeout=5.0):
+        """Stop the workers; queued jobs stay in the table for the next start."""
+        deadline = time.time() + timeout
+        # Persist what was submitted before stopping (the intake drains up to the sentinel)
+        self.intake.put(None)
+        if self.intake_thread is not None:
+            self.intake_thread.join(max(0.0, deadline - time.time()))
+        self.stop_event.set()
+        while not self.q.empty():
+            try:
+                self.q.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self.threads:
+            self.q.put(None)
+        for t in self.threads:
+            t.join(max(0.0, deadline - time.time()))
+
+
+_recognition_queue = None
+_recognition_queue_lock = threading.Lock()
+
+
+def get_recognition_queue(db_path=None):
+    """Process-wide queue shared by every camera pipeline (started on first use)."""
+    global _recognition_queue
+    with _recognition_queue_lock:
+        if _recognition_queue is None:
+            _recognition_queue = RecognitionQueue(
+                workers=int(os.getenv("RECOG_WORKERS", 2)),
+                high_water=int(os.getenv("RECOG_QUEUE_SIZE", 8)),
+                max_attempts=int(os.getenv("RECOG_MAX_ATTEMPTS", 3)),
+                owner=os.getenv("RECOG_QUEUE_OWNER") or os.getenv("CAMERA_ID", "LIFT"),
+                db_path=db_path or DB_PATH,
+            ).start()
+        return _recognition_queue
+
+
+def close_recognition_queue(timeout=5.0):
+    """Persist submitted jobs and stop the workers (jobs not finished are resumed on the next start)."""
+    if _recognition_queue is not None:
+        _recognition_queue.stop(timeout)
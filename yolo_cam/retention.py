@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+
+from capture_manifest import MANIFEST_NAME
+from frame_index import get_frame_index
+
+
+# ------------------- Capture Retention -------------------
+class RetentionManager:
+    """
+    Keeps one camera's capture folder within an age and size budget.
+
+    A background thread sweeps the folder every `interval` seconds: one
+    os.scandir walk (DirEntry caches the stat), then files older than
+    `max_age` are deleted, followed by the oldest remaining ones until the
+    folder is under `max_bytes`. Deletes run in batches of `batch_size` with
+    a pause between batches, on a thread that lowers its own CPU priority,
+    so the camera and recognition threads are not starved on a slow shared
+    volume. Empty sub-folders are removed and deleted captures are dropped
+    from the frame index. Files of the events `protected(folder)` returns
+    (recognition jobs still queued or running) are never deleted; they
+    still count towards the size budget.
+    """
+
+    def __init__(self, folder, max_bytes=2 * 1024 ** 3, max_age_seconds=7200,
+                 interval=60.0, batch_size=200, batch_pause=0.05, protected=None):
+        self.folder = folder
+        self.protected = protected
+        self.max_bytes = max_bytes
+        self.max_age = max_age_seconds
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+        self.bytes_in_use = 0
+        self.files_kept = 0   # over budget but kept for a pending recognition job (last sweep)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"retention-{os.path.basename(self.folder)}",
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(5.0)
+
+    def _run(self):
+        try:
+            os.nice(10)   # on Linux this only lowers this thread
+        except (AttributeError, OSError):
+            pass
+        while not self.stop_event.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[ERROR] Retention sweep of {self.folder} failed: {e}")
+            self.stop_event.wait(self.interval)
+
+    def scan(self):
+        """(files, dirs): files as (mtime, size, path) oldest first, dirs deepest first."""
+        files, dirs = [], []
+        stack = [self.folder]
+        while stack:
+            path = stack.pop()
+            try:
+                entries = list(os.scandir(path))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        dirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if entry.name.startswith(MANIFEST_NAME) or entry.name.endswith(".part"):
+                            continue   # the manifest, and captures the writer is still writing
+                        st = entry.stat(follow_symlinks=False)
+                        files.append((st.st_mtime, st.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+        files.sort()
+        dirs.sort(key=lambda d: d.count(os.sep), reverse=True)
+        return files, dirs
+
+    def sweep(self, now=None):
+        """Enforce the budget once; returns the bytes reclaimed."""
+        if not os.path.isdir(self.folder):
+            return 0
+        now = time.time() if now is None else now
+        files, dirs = self.scan()
+        total = sum(size for _, size, _ in files)
+        cutoff = now - self.max_age
+        protected = self.protected(self.folder) if self.protected is not None else ()
+        doomed = []
+        kept = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break   # oldest first: nothing after this is expired or over budget
+            # Captures are <event>_..., per-event crops go to an <event>/ sub-folder
+            if os.path.relpath(path, self.folder).split(os.sep)[0].split("_")[0] in protected:
+                kept += 1
+                continue
+            doomed.append((size, path))
+            total -= size
+        self.files_kept = kept
+
+        reclaimed = 0
+        deleted = []
+        for start in range(0, len(doomed), self.batch_size):
+            if self.stop_event.is_set():
+                break
+            for size, path in doomed[start:start + self.batch_size]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue   # already processed by recognition
+                except OSError as e:
+                    print(f"[WARN] Retention could not delete {path}: {e}")
+                    total += size
+                    continue
+                reclaimed += size
+                deleted.append(path)
+            self.stop_event.wait(self.batch_pause)
+
+        for path in dirs:
+            try:
+                os.rmdir(path)   # only succeeds when empty
+            except OSError:
+                pass
+
+        if deleted:
+            get_frame_index().drop_paths(self.folder, deleted)
+        self.files_deleted += len(deleted)
+        self.bytes_reclaimed += reclaimed
+        self.bytes_in_use = total
+        if deleted or kept:
+            print(f"[INFO] Retention {self.folder}: deleted {len(deleted)} files, "
+                  f"reclaimed {reclaimed / 1024 ** 2:.1f} MB, {total / 1024 ** 2:.1f} MB in use, "
+                  f"{kept} kept for pending recognition")
+        return reclaimed
+
+
+def retention_from_config(cfg, protected=None):
+    """RetentionManager for a CameraConfig's output folder, or None when disabled."""
+    if cfg.retention_max_mb <= 0 and cfg.retention_max_age_minutes <= 0:
+        return None
+    return RetentionManager(
+        cfg.output_dir,
+        max_bytes=cfg.retention_max_mb * 1024 ** 2 if cfg.retention_max_mb > 0 else float("inf"),
+        max_age_seconds=cfg.retention_max_age_minutes * 60 if cfg.retention_max_age_minutes > 0 else float("inf"),
+        interval=cfg.retention_interval,
+        batch_size=cfg.retention_batch_size,
+        protected=protected,
+    )
@@ -0,0 +1,150 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional; fall back to greedy matching
+    linear_sum_assignment = None
+
+
+# ------------------- IoU / Assignment -------------------
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between (N,4) and (M,4) arrays of x1, y1, x2, y2 boxes -> (N,M)."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = np.maximum(1, (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]))
+    area_b = np.maximum(1, (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]))
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def assign(iou, threshold):
+    """
+    Match rows (tracks) to columns (detections) maximising IoU.
+
+    Uses the Hungarian algorithm when scipy is installed, otherwise a greedy
+    best-pair-first pass. Returns a list of (row, col) pairs with IoU >= threshold.
+    """
+    if iou.size == 0:
+        return []
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-iou)
+        return [(r, c) for r, c in zip(rows, cols) if iou[r, c] >= threshold]
+
+    pairs = []
+    used_rows, used_cols = set(), set()
+    for flat in np.argsort(-iou, axis=None):
+        r, c = np.unravel_index(flat, iou.shape)
+        if iou[r, c] < threshold:
+            break
+        if r in used_rows or c in used_cols:
+            continue
+        pairs.append((int(r), int(c)))
+        used_rows.add(r)
+        used_cols.add(c)
+    return pairs
+
+
+# ------------------- Kalman Track -------------------
+def _box_to_z(box):
+    x1, y1, x2, y2 = box[:4]
+    w, h = max(1.0, x2 - x1), max(1.0, y2 - y1)
+    return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h], dtype=np.float64)
+
+
+def _x_to_box(x):
+    area, ratio = max(1.0, x[2]), max(1e-3, x[3])
+    w = np.sqrt(area * ratio)
+    h = area / w
+    return np.array([x[0] - w / 2, x[1] - h / 2, x[0] + w / 2, x[1] + h / 2])
+
+
+class KalmanTrack:
+    """
+    Constant-velocity Kalman filter over (cx, cy, area, aspect) as in SORT.
+
+    The prediction lets a person that moved a lot between detections still
+    overlap their own track.
+    """
+
+    _F = np.eye(7)
+    _F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+    _H = np.eye(4, 7)
+    _R = np.diag([1.0, 1.0, 10.0, 10.0])
+    _Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.x = np.zeros(7)
+        self.x[:4] = _box_to_z(box)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.box = tuple(int(v) for v in box[:4])   # last matched detection
+        self.hits = 1
+        self.age = 0
+        self.time_since_update = 0
+
+    def predict(self):
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self._F @ self.x
+        self.P = self._F @ self.P @ self._F.T + self._Q
+        self.age += 1
+        self.time_since_update += 1
+        return _x_to_box(self.x)
+
+    def update(self, box):
+        y = _box_to_z(box) - self._H @ self.x
+        S = self._H @ self.P @ self._H.T + self._R
+        K = self.P @ self._H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self._H) @ self.P
+        self.box = tuple(int(v) for v in box[:4])
+        self.hits += 1
+        self.time_since_update = 0
+
+
+# ------------------- Tracker -------------------
+class Tracker:
+    """
+    SORT-style multi-object tracker.
+
+    Call update() once per detection result (also with an empty list, so
+    tracks age). It returns (track_id, box) for every track matched in this
+    frame; track ids stay stable while the person keeps being detected and
+    are dropped after `max_age` results without a match.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=10, min_hits=1):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks = []
+        self.next_id = 1
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, boxes):
+        predicted = np.array([t.predict() for t in self.tracks]).reshape(-1, 4)
+        detections = np.asarray([b[:4] for b in boxes], dtype=np.float32).reshape(-1, 4)
+
+        pairs = assign(iou_matrix(predicted, detections), self.iou_threshold)
+        matched_dets = {c for _, c in pairs}
+
+        for r, c in pairs:
+            self.tracks[r].update(boxes[c])
+        for c in range(len(boxes)):
+            if c not in matched_dets:
+                self.tracks.append(KalmanTrack(self.next_id, boxes[c]))
+                self.next_id += 1
+
+        self.tracks = [t for t in self.tracks if t.time_since_update <= self.max_age]
+        return [(t.track_id, t.box) for t in self.tracks
+                if t.time_since_update == 0 and t.hits >= self.min_hits]
@@ -142,12 +142,12 @@ class FileManager:
                     continue
 
                 file_path = item["path"]
-                if os.path.exists(file_path) and os.path.isfile(file_path):
-                    os.remove(file_path)
-                    #print(f"🗑️ Deleted: {file_path}")
-                else:
-                    print(f"⚠️ File not found or invalid: {file_path}")
+                # One unlink per file; no exists/isfile stats beforehand
+                os.remove(file_path)
+                #print(f"🗑️ Deleted: {file_path}")
 
+            except FileNotFoundError:
+                print(f"⚠️ File not found or invalid: {item['path']}")
             except Exception as e:
                 print(f"❌ Error deleting {item.get('path', 'unknown')}: {e}")
 
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+
+from detector_backends import create_backend
+
+
+# ------------------- Threaded YOLO Worker -------------------
+class YOLOWorker:
+    """
+    Run the person detector on a background thread, shared by one or more cameras.
+
+    Each source (camera) has a single pending slot, so a newer frame replaces
+    one that has not been picked up yet. The worker batches the pending frame
+    of every source into one model call and returns envelopes keyed by the
+    capture frame_id, so callers can join detections back to the exact frame
+    they were computed on.
+
+    The model runs through a pluggable backend (see detector_backends.py);
+    by default it is chosen by DETECTOR_BACKEND.
+    """
+
+    def __init__(self, model_path="yolov8n.pt", conf=0.5, max_batch=8, max_results=8, backend=None):
+        self.backend = backend or create_backend(model_path, conf)
+        self.conf = conf
+        self.max_batch = max_batch
+        self.max_results = max_results
+        self.cond = threading.Condition()
+        self.slots = {}     # source -> (frame_id, capture_ts, frame, queued_ts)
+        self.outputs = {}   # source -> deque of finished envelopes
+        self.stopped = False
+        self.dropped_in = 0    # frames replaced by a newer one before inference
+        self.dropped_out = 0   # results discarded because nobody collected them
+        self.batches = 0
+        self.avg_batch_size = 0.0
+        self.avg_queue_wait = 0.0
+        self.avg_infer_time = 0.0
+
+    def start(self):
+        t = threading.Thread(target=self._infer, daemon=True)
+        t.start()
+        return self
+
+    def _infer(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.stopped or self.slots)
+                if self.stopped:
+                    break
+                sources = list(self.slots)[:self.max_batch]
+                batch = [(source, self.slots.pop(source)) for source in sources]
+
+            frames = [item[2] for _, item in batch]
+            started = time.time()
+            detections = self.backend.detect(frames)
+            finished = time.time()
+            infer_time = finished - started
+
+            self.batches += 1
+            self.avg_batch_size = 0.9 * self.avg_batch_size + 0.1 * len(batch)
+            self.avg_infer_time = 0.9 * self.avg_infer_time + 0.1 * infer_time
+
+            with self.cond:
+                for (source, (frame_id, capture_ts, frame, queued_ts)), boxes in zip(batch, detections):
+                    queue_wait = started - queued_ts
+                    self.avg_queue_wait = 0.9 * self.avg_queue_wait + 0.1 * queue_wait
+                    out = self.outputs.setdefault(source, deque(maxlen=self.max_results))
+                    if len(out) == out.maxlen:
+                        self.dropped_out += 1
+                    out.append({
+                        "source": source,
+                        "frame_id": frame_id,
+                        "capture_ts": capture_ts,
+                        "frame": frame,
+                        "boxes": boxes,
+                        "queue_wait": queue_wait,
+                        "infer_time": infer_time,
+                        "batch_size": len(batch),
+                    })
+
+    def infer_async(self, frame_id, capture_ts, frame, source=None):
+        """Queue a frame for inference; a stale pending frame of the same source is replaced."""
+        with self.cond:
+            if source in self.slots:
+                self.dropped_in += 1
+            self.slots[source] = (frame_id, capture_ts, frame, time.time())
+            self.cond.notify()
+
+    def get_results(self, source=None):
+        """Return the oldest finished envelope for `source`, or None if nothing is ready."""
+        with self.cond:
+            out = self.outputs.get(source)
+            if out:
+                return out.popleft()
+            return None
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()